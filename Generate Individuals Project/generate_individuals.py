@@ -46,7 +46,7 @@ def gameplay(individual_1: EvolvedAgent, individual_2: EvolvedAgent, game: quart
     # Play num_games games between each individual pair
     for _ in range(num_games):
         game.reset()
-        result = game.run()
+        result = game.play().winner
         if result == -1:
             draw += 1
         elif result == 0:
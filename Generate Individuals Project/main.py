@@ -44,7 +44,7 @@ def main():
     game.set_players((RandomPlayer(game), GA_agent))
     for _ in range(iter):
         game.reset()
-        result = game.run()
+        result = game.play().winner
         if result == -1:
             draw += 1
         elif result == 0:
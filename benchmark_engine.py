@@ -0,0 +1,174 @@
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import time
+import numpy as np
+import quarto
+from quarto import kernel
+from extendedQuarto import ExtendedQuarto
+from testQuarto import TestQuarto
+
+
+def bench_reset(engine, count: int) -> dict:
+    game = engine()
+    start = time.perf_counter()
+    for _ in range(count):
+        game.reset()
+    return {'reset': (time.perf_counter() - start) / count}
+
+
+def bench_select(engine, count: int) -> dict:
+    game = engine()
+    start = time.perf_counter()
+    for i in range(count):
+        game.select(i & 15)
+    return {'select': (time.perf_counter() - start) / count}
+
+
+def bench_fill(engine, count: int) -> dict:
+    '''
+    Fill count boards cell by cell, timing separately place, check_winner, check_finished
+    and get_board_status after every placement
+    '''
+    rng = random.Random(0)
+    pieces, cells = list(range(16)), list(range(16))
+    rng.shuffle(pieces)
+    rng.shuffle(cells)
+    games = [engine() for _ in range(count)]
+    timings = dict.fromkeys(('place', 'check_winner', 'check_finished', 'get_board_status'), 0.0)
+    for piece, cell in zip(pieces, cells):
+        x, y = cell % 4, cell // 4
+        for game in games:
+            game.select(piece)
+        start = time.perf_counter()
+        for game in games:
+            game.place(x, y)
+        timings['place'] += time.perf_counter() - start
+        for name in ('check_winner', 'check_finished', 'get_board_status'):
+            start = time.perf_counter()
+            for game in games:
+                getattr(game, name)()
+            timings[name] += time.perf_counter() - start
+    return {name: elapsed / (16 * count) for name, elapsed in timings.items()}
+
+
+def bench_fork(engine, count: int) -> dict:
+    '''
+    Copies of a midgame position, to a new game and into a pre-allocated one
+    '''
+    game, pool = engine(), engine()
+    for piece, x, y in ((0, 0, 0), (5, 1, 1), (10, 2, 2), (15, 3, 0)):
+        game.push(piece, x, y)
+    start = time.perf_counter()
+    for _ in range(count):
+        game.fork()
+    fork = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for _ in range(count):
+        game.copy_state(pool)
+    return {'fork': fork, 'copy_state': (time.perf_counter() - start) / count}
+
+
+def bench_random_game(engine, count: int) -> dict:
+    rng = random.Random(0)
+    game = engine()
+    game.set_players((quarto.LegalRandomPlayer(game, rng), quarto.LegalRandomPlayer(game, rng)))
+    start = time.perf_counter()
+    for _ in range(count):
+        game.reset()
+        game.play()
+    return {'random_game': (time.perf_counter() - start) / count}
+
+
+def bench_playouts(count: int) -> dict:
+    '''
+    Random playouts of the packed kernel (compiled when Numba is installed)
+    '''
+    kernel.random_playouts(1)
+    start = time.perf_counter()
+    kernel.random_playouts(count)
+    return {'kernel.random_playout': (time.perf_counter() - start) / count}
+
+
+def bench_construction(count: int) -> dict:
+    board = np.ones(shape=(4, 4), dtype=int) * -1
+    start = time.perf_counter()
+    for _ in range(count):
+        ExtendedQuarto()
+    extended = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for _ in range(count):
+        TestQuarto(board.copy())
+    return {'ExtendedQuarto.__init__': extended, 'TestQuarto.__init__': (time.perf_counter() - start) / count}
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> dict:
+    '''
+    Seconds per operation of every benchmark, best of repeat runs
+    '''
+    results = {}
+
+    def keep_best(timings: dict, prefix: str = ''):
+        for name, seconds in timings.items():
+            key = prefix + name
+            results[key] = min(results.get(key, seconds), seconds)
+
+    for _ in range(repeat):
+        for engine in (quarto.Quarto, quarto.BitboardQuarto):
+            prefix = engine.__name__ + '.'
+            keep_best(bench_reset(engine, int(20000 * scale)), prefix)
+            keep_best(bench_select(engine, int(20000 * scale)), prefix)
+            keep_best(bench_fill(engine, int(500 * scale)), prefix)
+            keep_best(bench_fork(engine, int(20000 * scale)), prefix)
+            keep_best(bench_random_game(engine, int(500 * scale)), prefix)
+        keep_best(bench_construction(int(5000 * scale)))
+        keep_best(bench_playouts(int((100000 if kernel.HAVE_NUMBA else 2000) * scale)))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    '''
+    Benchmarks slower than the baseline by more than threshold (0.1 = 10%),
+    as (name, baseline seconds, seconds)
+    '''
+    return [(name, baseline[name], seconds) for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + threshold)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks of the Quarto engines')
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+    parser.add_argument('-b', '--baseline', help='JSON results to compare against')
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline (default 0.2, i.e. 20%%)')
+    parser.add_argument('-s', '--scale', type=float, default=1.0, help='multiplier of the iteration counts')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per benchmark, the best one is kept')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': kernel.HAVE_NUMBA,
+        'results': run_benchmarks(args.scale, args.repeat),
+    }
+    for name, seconds in report['results'].items():
+        logging.warning(f"benchmark: {name}: {seconds * 1e6:.3f} us")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(report['results'], baseline, args.threshold)
+        for name, before, after in regressions:
+            logging.warning(f"benchmark: REGRESSION {name}: {before * 1e6:.3f} us -> {after * 1e6:.3f} us")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import quarto
-from copy import deepcopy
 import numpy as np
-import testQuarto
+
+_PIECE_IDS = np.arange(16)
 
 class ExtendedQuarto(quarto.Quarto):
     '''
@@ -17,37 +17,36 @@ class ExtendedQuarto(quarto.Quarto):
         self._current_player = player
     
 
-    def get_unchosen_pieces(self) -> list:
+    def get_unchosen_mask(self) -> int:
         '''
-        Get a list of all unchosen pieces
+        Mask of the pieces not on the board yet (bit i for piece i), kept up to date by place and undo
         '''
-        unchosen_pieces = list(range(16))
-        
-        for y, row in enumerate(self._board):
-            for x, index_at_place in enumerate(row):
-                if index_at_place == -1: #empty place
-                    continue
-                else:
-                    unchosen_pieces.remove(index_at_place) #piece already played
+        return ~self._used_pieces & 0xFFFF
 
-        return unchosen_pieces
+    def get_unchosen_pieces(self) -> list:
+        '''
+        Get a list of all unchosen pieces, in increasing order
+        '''
+        return list(quarto.mask_bits(self.get_unchosen_mask())) # ordered view cached per mask, no board scan
         
     def check_if_possible_to_win(self, piece_idx: int) -> bool:
         '''
         Given a piece, checks if it's possible to win with that piece
-        ''' 
-        for y, row in enumerate(self._board):
-            for x, index_at_place in enumerate(row):
-                if index_at_place == -1:  
-
-                    new_arr_board = deepcopy(self._board)
-                    new_board = testQuarto.TestQuarto(new_arr_board) #creates a test quarto to apply the possible move
-                    
-                    new_board.select(piece_idx) # select the piece we want to place
-                    new_board.place(x,y) # place the piece 
-
-                    if (new_board.check_finished() or new_board.check_winner() != -1): #if the game is over and it's not a tie
-                        return True
-                
-        return False
+        '''
+        empty_cells = self.legal_moves()[0]
+        if not empty_cells or self._used_pieces >> quarto.piece_index(piece_idx) & 1:
+            return False
+        if not empty_cells & (empty_cells - 1) or self.check_winner() != -1: # the last piece ends the game anyway
+            return True
+        return self.winning_cells(piece_idx) != 0 # read from the threat map, no move is tried
 
+    def immediate_wins(self) -> np.ndarray:
+        '''
+        Boolean matrix of 16 pieces x 16 cells: [piece, y * 4 + x] tells whether placing
+        piece in the empty cell (x, y) completes a line. Rows of pieces on the board are False
+        '''
+        threats = self.threats()
+        pieces = _PIECE_IDS[:, None]
+        wins = (pieces & threats.need_set) | (~pieces & threats.need_clear) != 0
+        wins &= (self._used_pieces >> pieces & 1) == 0
+        return wins
@@ -143,7 +143,7 @@ class UntrainedGAAgent(quarto.Player):
         '''Store each row/column/diagonal with at least one shared attribute in the dom_line_dict based on how long they are.
         Each row, column and diagonal have been assigned a number, where the rows from top to bottom are
         0 - 3, columns from left to right are 4-7, diagonal 8 and off-diagonal 9.'''
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
 
         self.dom_line_dict['1'] = []
         self.dom_line_dict['2'] = []
@@ -225,7 +225,7 @@ class UntrainedGAAgent(quarto.Player):
     def check_attributes(self) -> list:
         '''Calculate the number of each attribute on the board.'''
 
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
         attribue_values = {}
         attribue_values['High'] = 0
         attribue_values['Low'] = 0
@@ -330,7 +330,7 @@ class UntrainedGAAgent(quarto.Player):
         it returns false and None'''
 
         for i in range(16):
-            if i not in self.board.get_board_status():
+            if i not in self.board.get_board_view():
                 piece = self.board.get_piece_charachteristics(i)
                 if piece.HIGH in desired_piece[0] and piece.COLOURED in desired_piece[1] \
                     and piece.SOLID in desired_piece[2] and piece.SQUARE in desired_piece[3]:
@@ -339,7 +339,7 @@ class UntrainedGAAgent(quarto.Player):
 
     def place_piece_specified_line(self, line) -> tuple([int, int]):
         '''This function checks if the selected piece can be placed such that the agent wins'''
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
 
         # Check if the piece should be placed in a row
         if line[1] >= 0 and line[1] <= 3:
@@ -367,7 +367,7 @@ class UntrainedGAAgent(quarto.Player):
         '''This function counts the number of shared attributes in the line with the selected piece. If the piece
         is high and the line contains 2 high pieces, this will count as 2 shared attributes. Thus, longer lines will
         therefore have an advantage in being picked'''
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
         line_val = []
 
         # For each row
@@ -415,7 +415,7 @@ class UntrainedGAAgent(quarto.Player):
     def length_of_board_lines(self) -> list:
         '''Counts the lengths of all lines with at least 1 free spot'''
 
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
         length = []
 
         for row in board:
@@ -449,7 +449,7 @@ class UntrainedGAAgent(quarto.Player):
         attribute_values = self.check_attributes()
         piece_ranking = self.rank_pieces(attribute_values)
         max_pos = piece_ranking.index(max(piece_ranking))
-        while max_pos in self.board.get_board_status():
+        while max_pos in self.board.get_board_view():
             piece_ranking[max_pos] = -1
             max_pos = piece_ranking.index(max(piece_ranking))
         return max_pos
@@ -460,7 +460,7 @@ class UntrainedGAAgent(quarto.Player):
         attribute_values = self.check_attributes()
         piece_ranking = self.rank_pieces(attribute_values)
         min_pos = piece_ranking.index(min(piece_ranking))
-        while min_pos in self.board.get_board_status():
+        while min_pos in self.board.get_board_view():
             piece_ranking[min_pos] = 100
             min_pos = piece_ranking.index(min(piece_ranking))
         return min_pos
@@ -468,7 +468,7 @@ class UntrainedGAAgent(quarto.Player):
     def pick_rule_3(self) -> int:
         '''Pick a piece at random'''
         random_piece = random.randint(0, 15)
-        while random_piece in self.board.get_board_status():
+        while random_piece in self.board.get_board_view():
             random_piece = random.randint(0, 15)
         return random_piece
 
@@ -539,7 +539,7 @@ class UntrainedGAAgent(quarto.Player):
 
     def place_rule_6(self):
         '''Place the piece at random'''
-        board = self.board.get_board_status()
+        board = self.board.get_board_view()
 
         x = random.randint(0, 3)
         y = random.randint(0, 3)
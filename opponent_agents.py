@@ -23,15 +23,14 @@ class DumbAgent(Player):
     
     if (len(unchosen_pieces) > 0): 
 
-      for piece in unchosen_pieces:
-        win = board.check_if_possible_to_win(piece) #checks if it's possible to win with said piece
+      wins = board.immediate_wins().any(axis=1) #pieces the opponent can win with, all checked at once
 
-        if (win == True):
+      for piece in unchosen_pieces:
+        if wins[piece]:
           return piece
-    
-        else: #chosenPieces
-          p = random.randint(0, len(unchosen_pieces) -1) # between 0 and 15 
-          return unchosen_pieces[p]
+
+      p = random.randint(0, len(unchosen_pieces) -1) # between 0 and 15 
+      return unchosen_pieces[p]
 
     else:
       return -1 # In case the board is full
@@ -39,9 +38,9 @@ class DumbAgent(Player):
 
   def place_piece(self) -> tuple[int, int]:
     '''
-    Place the piece in a random place
+    Place the piece in a random empty place
     '''
-    return random.randint(0, 3), random.randint(0, 3)
+    return self.get_game().random_empty_cell()
 
 
   
\ No newline at end of file
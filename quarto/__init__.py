@@ -1,4 +1,9 @@
 # Free for personal or classroom use; see 'LICENSE.md' for details.
 # https://github.com/squillero/computational-intelligence
 
-from .objects import *
\ No newline at end of file
+from .objects import *
+from .bitboard import *
+from .symmetry import *
+from .batch import *
+from .records import *
+from .positions import *
@@ -0,0 +1,143 @@
+import numpy as np
+from .objects import BOARD_LINES
+
+
+_LINES = np.array(BOARD_LINES)
+_PIECE_BITS = np.arange(16, dtype=np.uint16)
+
+
+def _sample(rng: np.random.Generator, allowed: np.ndarray) -> np.ndarray:
+    '''
+    For every row of a boolean matrix, the column of a uniformly chosen True entry (0 if none)
+    '''
+    scores = rng.random(allowed.shape)
+    scores[~allowed] = -1
+    return scores.argmax(axis=1)
+
+
+class QuartoBatch(object):
+    '''
+    Many independent games of Quarto stepped together as NumPy arrays. Boards are
+    stored flat, cell y * 4 + x holding the index of its piece or -1
+    '''
+
+    MAX_PLAYERS = 2
+    BOARD_SIDE = 4
+
+    def __init__(self, games: int) -> None:
+        self._games = games
+        self.reset()
+
+    def __len__(self) -> int:
+        return self._games
+
+    def reset(self):
+        self._boards = np.full((self._games, 16), -1, dtype=np.int8)
+        self._used_pieces = np.zeros(self._games, dtype=np.uint16)
+        self._selected_pieces = np.full(self._games, -1, dtype=np.int8)
+        self._current_players = np.zeros(self._games, dtype=np.int8)
+        self._plies = np.zeros(self._games, dtype=np.int8)
+        self._winners = np.full(self._games, -1, dtype=np.int8)
+        self._finished = np.zeros(self._games, dtype=bool)
+
+    def get_boards(self) -> np.ndarray:
+        '''
+        Read-only view of the boards, shaped (games, 4, 4)
+        '''
+        boards = self._boards.reshape(self._games, self.BOARD_SIDE, self.BOARD_SIDE)
+        boards.flags.writeable = False
+        return boards
+
+    def get_selected_pieces(self) -> np.ndarray:
+        '''
+        Copy of the last selected piece of every game (-1 before the first move)
+        '''
+        return self._selected_pieces.copy()
+
+    def get_current_players(self) -> np.ndarray:
+        '''
+        Copy of the player to move (the one who selects the next piece) of every game
+        '''
+        return self._current_players.copy()
+
+    def get_winners(self) -> np.ndarray:
+        '''
+        Copy of the winner of every game, -1 while it is not won
+        '''
+        return self._winners.copy()
+
+    def get_finished(self) -> np.ndarray:
+        '''
+        Copy of the mask of the games that are over (won or board full)
+        '''
+        return self._finished.copy()
+
+    def legal_cells(self) -> np.ndarray:
+        '''
+        Mask (games, 16) of the empty cells of the unfinished games
+        '''
+        return (self._boards < 0) & ~self._finished[:, None]
+
+    def legal_pieces(self) -> np.ndarray:
+        '''
+        Mask (games, 16) of the pieces not yet on the board of the unfinished games
+        '''
+        return (self._used_pieces[:, None] >> _PIECE_BITS & 1 == 0) & ~self._finished[:, None]
+
+    def step(self, pieces: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        '''
+        Play a ply in every unfinished game, as Quarto.push does: the current player
+        selects pieces[i] and the opponent places it in (xs[i], ys[i]). Illegal moves
+        leave their game untouched. Returns the mask of the games that moved
+        '''
+        pieces, xs, ys = np.asarray(pieces), np.asarray(xs), np.asarray(ys)
+        valid = (pieces >= 0) & (pieces < 16) & (xs >= 0) & (xs < 4) & (ys >= 0) & (ys < 4)
+        pieces, cells = np.where(valid, pieces, 0), np.where(valid, ys * 4 + xs, 0)
+        games = np.arange(self._games)
+        valid &= ~self._finished & (self._boards[games, cells] < 0) & (
+            self._used_pieces >> pieces.astype(np.uint16) & 1 == 0)
+        games, pieces, cells = games[valid], pieces[valid], cells[valid]
+        self._boards[games, cells] = pieces
+        self._used_pieces[games] |= np.left_shift(1, pieces).astype(np.uint16)
+        self._selected_pieces[games] = pieces
+        self._current_players[games] ^= 1
+        self._plies[games] += 1
+        won = self.__winning(self._boards[games])
+        self._winners[games[won]] = self._current_players[games[won]]
+        self._finished[games] = won | (self._plies[games] == 16)
+        return valid
+
+    def __winning(self, boards: np.ndarray) -> np.ndarray:
+        '''
+        Mask of the boards with a full line whose pieces share an attribute (AND of
+        the bits) or share its absence (NOR)
+        '''
+        lines = boards[:, _LINES]
+        full = (lines >= 0).all(axis=2)
+        shared = np.bitwise_and.reduce(lines, axis=2) | ~np.bitwise_or.reduce(lines, axis=2)
+        return (full & (shared & 15 != 0)).any(axis=1)
+
+    def check_winner(self) -> np.ndarray:
+        '''
+        Recompute in one pass which games are won and return the winners (-1 if not won)
+        '''
+        won = self.__winning(self._boards)
+        return np.where(won, self._current_players, -1)
+
+    def random_moves(self, rng: np.random.Generator = None) -> tuple:
+        '''
+        A uniformly random legal move for every game, as (pieces, xs, ys)
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        pieces = _sample(rng, self.legal_pieces())
+        cells = _sample(rng, self.legal_cells())
+        return pieces, cells % 4, cells // 4
+
+    def rollout(self, rng: np.random.Generator = None) -> np.ndarray:
+        '''
+        Play random legal moves until every game is over. Returns the winners
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        while not self._finished.all():
+            self.step(*self.random_moves(rng))
+        return self.get_winners()
@@ -0,0 +1,200 @@
+import numpy as np
+import operator
+from .objects import BOARD_LINES, WINNING_LINE, ZOBRIST_CELLS, ZOBRIST_SELECTED, Quarto, piece_index
+
+
+# nibble shifts of the four cells of every line
+_LINE_SHIFTS = tuple(tuple(4 * cell for cell in line) for line in BOARD_LINES)
+_LINE_MASKS = tuple(sum(1 << cell for cell in line) for line in BOARD_LINES)
+_LINES = tuple(zip(_LINE_MASKS, _LINE_SHIFTS))
+
+
+class BitboardQuarto(Quarto):
+    '''
+    Quarto core that packs the whole position into a few integers.
+    The piece placed in cell (x, y) is stored in the nibble y * 4 + x of a 64-bit
+    integer, a 16-bit mask tells which cells are occupied and another 16-bit mask
+    tells which pieces are already on the board.
+    '''
+    def reset(self):
+        self._cells = 0
+        self._occupied = 0
+        self._used_pieces = 0
+        self._current_player = 0
+        self._selected_piece_index = -1
+        self._hash = 0
+        self._last_placed = -1
+        self._winning = None
+        self._previous_winning = None
+        self._threats = None
+        self._previous_threats = None
+        self._board_buffer = None
+        self._board_view = None
+        self._undo = []
+
+    def select(self, pieceIndex: int) -> bool:
+        '''
+        select a piece. Returns True on success, False if the piece is already on
+        the board. Raises ValueError if pieceIndex is not a piece
+        '''
+        pieceIndex = piece_index(pieceIndex)
+        if not self._used_pieces >> pieceIndex & 1:
+            self._hash ^= ZOBRIST_SELECTED[self._pending_piece()] ^ ZOBRIST_SELECTED[pieceIndex]
+            self._selected_piece_index = pieceIndex
+            return True
+        return False
+
+    def place(self, x: int, y: int) -> bool:
+        '''
+        Place piece in coordinates (x, y). Returns true on success
+        '''
+        # NumPy integers would turn the packed masks into fixed-size integers
+        x, y = operator.index(x), operator.index(y)
+        if y < 0 or x < 0 or x > 3 or y > 3:
+            return False
+        cell = y * 4 + x
+        piece = self._selected_piece_index
+        if self._occupied >> cell & 1 or piece < 0 or self._used_pieces >> piece & 1:
+            return False
+        self._cells |= piece << 4 * cell
+        self._occupied |= 1 << cell
+        self._used_pieces |= 1 << piece
+        self._hash ^= ZOBRIST_CELLS[cell][piece] ^ ZOBRIST_SELECTED[piece]
+        self._placed(cell)
+        if self._board_buffer is not None:
+            self._board_buffer[y, x] = piece
+        return True
+
+    def push(self, piece: int, x: int, y: int) -> bool:
+        '''
+        Play a whole ply in place, as run() does: the current player selects the piece
+        and the opponent places it in (x, y). Returns True on success, the ply can be
+        undone with pop()
+        '''
+        if y < 0 or x < 0 or x > 3 or y > 3 or self._occupied >> (y * 4 + x) & 1:
+            return False
+        state = (self._cells, self._occupied, self._used_pieces, self._selected_piece_index,
+                 self._hash, self._current_player, self._last_placed,
+                 self._winning, self._previous_winning, self._threats, self._previous_threats)
+        if not self.select(piece):
+            return False
+        self._current_player = (self._current_player + 1) % self.MAX_PLAYERS
+        self.place(x, y)
+        self._undo.append((piece, x, y, state))
+        return True
+
+    def pop(self) -> tuple:
+        '''
+        Undo the last push(), restoring selected piece, current player and cached
+        winner. Returns the undone move as (piece, x, y)
+        '''
+        piece, x, y, state = self._undo.pop()
+        (self._cells, self._occupied, self._used_pieces, self._selected_piece_index,
+         self._hash, self._current_player, self._last_placed,
+         self._winning, self._previous_winning, self._threats, self._previous_threats) = state
+        if self._board_buffer is not None:
+            self._board_buffer[y, x] = -1
+        return piece, x, y
+
+    def copy_state(self, into: Quarto) -> Quarto:
+        '''
+        Copy the packed position into another BitboardQuarto, keeping its players and
+        observers, refreshing its board view and clearing its undo stack. Returns into
+        '''
+        if into is self:
+            return into
+        (into._cells, into._occupied, into._used_pieces, into._selected_piece_index,
+         into._hash, into._current_player, into._last_placed, into._winning,
+         into._previous_winning, into._threats, into._previous_threats) = (
+            self._cells, self._occupied, self._used_pieces, self._selected_piece_index,
+            self._hash, self._current_player, self._last_placed, self._winning,
+            self._previous_winning, self._threats, self._previous_threats)
+        board = getattr(into, '_board_buffer', None)
+        if board is None:
+            into._board_buffer = None
+            into._board_view = None
+        else:
+            board[...] = self.get_board_status()
+        into._undo = []
+        return into
+
+    def print(self):
+        '''
+        Print the board
+        '''
+        for row in self.get_board_status():
+            print("\n -------------------")
+            print("|", end="")
+            for element in row:
+                print(f" {element: >2}", end=" |")
+        print("\n -------------------\n")
+        print(f"Selected piece: {self._selected_piece_index}\n")
+
+    def get_board_status(self) -> np.ndarray:
+        '''
+        Get the current board status (pieces are represented by index)
+        '''
+        cells, occupied = self._cells, self._occupied
+        return np.array([cells >> 4 * cell & 15 if occupied >> cell & 1 else -1
+                         for cell in range(16)]).reshape(self.BOARD_SIDE, self.BOARD_SIDE)
+
+    def set_board(self, board: np.ndarray):
+        '''
+        Replace the board, packing it. The selected piece and the current player
+        are kept, the undo stack is cleared
+        '''
+        self._cells, self._occupied, self._used_pieces, self._hash = 0, 0, 0, 0
+        for cell, piece in enumerate(np.asarray(board).ravel().tolist()):
+            if piece >= 0:
+                self._cells |= piece << 4 * cell
+                self._occupied |= 1 << cell
+                self._used_pieces |= 1 << piece
+                self._hash ^= ZOBRIST_CELLS[cell][piece]
+        self._hash ^= ZOBRIST_SELECTED[self._pending_piece()]
+        self._last_placed = -1
+        self._winning = None
+        self._previous_winning = None
+        self._threats = None
+        self._previous_threats = None
+        self._board_buffer = None
+        self._board_view = None
+        self._undo = []
+
+    def pack(self) -> tuple:
+        '''
+        The packed board: (cells, occupied, used pieces)
+        '''
+        return self._cells, self._occupied, self._used_pieces
+
+    def get_board_view(self) -> np.ndarray:
+        '''
+        Get a read-only view of the board. It is unpacked on the first call, then place
+        and pop update it in place so that it follows the game as on Quarto
+        '''
+        if self._board_view is None:
+            self._board_buffer = self.get_board_status()
+            self._board_view = self._board_buffer.view()
+            self._board_view.flags.writeable = False
+        return self._board_view
+
+    def _piece_at(self, cell: int) -> int:
+        return self._cells >> 4 * cell & 15 if self._occupied >> cell & 1 else -1
+
+    def get_selected_piece(self) -> int:
+        '''
+        Get index of selected piece
+        '''
+        return self._selected_piece_index
+
+    def _has_winning_line(self, lines: tuple) -> bool:
+        '''
+        Tells whether one of the given lines (indexes in BOARD_LINES) is a winning one
+        '''
+        cells, occupied = self._cells, self._occupied
+        for line in lines:
+            mask, (a, b, c, d) = _LINES[line]
+            if occupied & mask != mask:
+                continue
+            if WINNING_LINE[cells >> a & 15 | (cells >> b & 15) << 4 | (cells >> c & 15) << 8 | (cells >> d & 15) << 12]:
+                return True
+        return False
@@ -0,0 +1,189 @@
+import numpy as np
+from .objects import BOARD_LINES, CELL_LINES, WINNING_LINE
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        '''
+        Stand-in for numba.njit when Numba is not installed: the functions stay plain Python
+        '''
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+# Kernels of the game rules on positions packed as in BitboardQuarto and Quarto.pack(): the
+# piece of cell y * 4 + x in nibble y * 4 + x of cells, 16-bit masks of the occupied cells and
+# of the pieces on the board. Compiled code holds cells in a signed 64-bit integer, so the public
+# functions convert it on the way in and out and every path gives the same bits.
+# Random moves come from a 32-bit xorshift generator, identical with and without Numba.
+_CELL_BITS = (1 << 64) - 1
+_LINE_MASKS = tuple(sum(1 << cell for cell in line) for line in BOARD_LINES)
+# lines through every cell, padded to three by repeating the first one
+_CELL_LINES = tuple(lines + lines[:1] * (3 - len(lines)) for lines in CELL_LINES)
+if HAVE_NUMBA:
+    # compiled code reads tables from arrays, Python is faster on bytes and tuples
+    _WINNING = np.frombuffer(WINNING_LINE, dtype=np.uint8)
+    _LINE_CELLS = np.array(BOARD_LINES, dtype=np.int64)
+    _LINE_MASKS = np.array(_LINE_MASKS, dtype=np.int64)
+    _CELL_LINES = np.array(_CELL_LINES, dtype=np.int64)
+else:
+    _WINNING = WINNING_LINE
+    _LINE_CELLS = BOARD_LINES
+
+
+def _signed(cells: int) -> int:
+    return cells - (1 << 64) if cells >> 63 else cells
+
+
+def _seed(seed: int) -> int:
+    '''
+    State of the xorshift generator, which must not be 0
+    '''
+    return seed & 0xFFFFFFFF or 0x9E3779B9
+
+
+@njit(cache=True)
+def _xorshift(state):
+    state ^= state << 13 & 0xFFFFFFFF
+    state ^= state >> 17
+    state ^= state << 5 & 0xFFFFFFFF
+    return state
+
+
+@njit(cache=True)
+def _popcount(mask):
+    count = 0
+    while mask:
+        mask &= mask - 1
+        count += 1
+    return count
+
+
+@njit(cache=True)
+def _nth_bit(mask, n):
+    '''
+    Index of the n-th (from 0) bit set in mask
+    '''
+    for _ in range(n):
+        mask &= mask - 1
+    bit = 0
+    while not mask >> bit & 1:
+        bit += 1
+    return bit
+
+
+@njit(cache=True)
+def _line_wins(cells, occupied, line):
+    mask = _LINE_MASKS[line]
+    if occupied & mask != mask:
+        return False
+    key = 0
+    for i in range(4):
+        key |= (cells >> 4 * _LINE_CELLS[line][i] & 15) << 4 * i
+    return _WINNING[key] != 0
+
+
+@njit(cache=True)
+def _is_winning(cells, occupied):
+    for line in range(10):
+        if _line_wins(cells, occupied, line):
+            return True
+    return False
+
+
+@njit(cache=True)
+def _wins_through(cells, occupied, cell):
+    for i in range(3):
+        if _line_wins(cells, occupied, _CELL_LINES[cell][i]):
+            return True
+    return False
+
+
+@njit(cache=True)
+def _place(cells, occupied, used, piece, cell):
+    return cells | piece << 4 * cell, occupied | 1 << cell, used | 1 << piece
+
+
+@njit(cache=True)
+def _legal_masks(occupied, used, selected):
+    free = ~used & 0xFFFF
+    if selected >= 0:
+        free &= ~(1 << selected)
+    return ~occupied & 0xFFFF, free
+
+
+@njit(cache=True)
+def _playout(cells, occupied, used, player, state):
+    while occupied != 0xFFFF:
+        free = ~used & 0xFFFF
+        state = _xorshift(state)
+        piece = _nth_bit(free, state % _popcount(free))
+        empty = ~occupied & 0xFFFF
+        state = _xorshift(state)
+        cell = _nth_bit(empty, state % _popcount(empty))
+        cells, occupied, used = _place(cells, occupied, used, piece, cell)
+        player ^= 1
+        if _wins_through(cells, occupied, cell):
+            return player, state
+    return -1, state
+
+
+@njit(cache=True)
+def _playouts(games, cells, occupied, used, player, state):
+    winners = np.empty(games, dtype=np.int8)
+    for game in range(games):
+        winners[game], state = _playout(cells, occupied, used, player, state)
+    return winners, state
+
+
+def place(cells: int, occupied: int, used: int, piece: int, cell: int) -> tuple:
+    '''
+    Packed position after placing piece in cell (y * 4 + x), which must be legal
+    '''
+    cells, occupied, used = _place(_signed(cells), occupied, used, piece, cell)
+    return cells & _CELL_BITS, occupied, used
+
+
+def is_winning(cells: int, occupied: int) -> bool:
+    '''
+    Tells whether a full line of the packed board shares an attribute
+    '''
+    return bool(_is_winning(_signed(cells), occupied))
+
+
+def wins_through(cells: int, occupied: int, cell: int) -> bool:
+    '''
+    Tells whether a full line through cell shares an attribute
+    '''
+    return bool(_wins_through(_signed(cells), occupied, cell))
+
+
+def legal_masks(occupied: int, used: int, selected: int = -1) -> tuple:
+    '''
+    Masks of the empty cells and of the pieces neither on the board nor selected,
+    as Quarto.legal_moves()
+    '''
+    return _legal_masks(occupied, used, selected)
+
+
+def random_playout(cells: int, occupied: int, used: int, player: int = 0, seed: int = 1) -> tuple:
+    '''
+    Play uniformly random plies (as Quarto.push()) from a position that is not won,
+    player selecting the first piece. Returns the winner (-1 on a draw) and the seed
+    that continues the random sequence
+    '''
+    return _playout(_signed(cells), occupied, used, player, _seed(seed))
+
+
+def random_playouts(games: int, seed: int = 1, cells: int = 0, occupied: int = 0, used: int = 0,
+                    player: int = 0) -> np.ndarray:
+    '''
+    Winners of games random playouts from the same position (the empty board by
+    default), one random sequence running through all of them
+    '''
+    return _playouts(games, _signed(cells), occupied, used, player, _seed(seed))[0]
@@ -1,9 +1,97 @@
 # Free for personal or classroom use; see 'LICENSE.md' for details.
 # https://github.com/squillero/computational-intelligence
 
+import numbers
 import numpy as np
+import operator
+import random
+import time
 from abc import abstractmethod
-import copy
+from functools import lru_cache
+from typing import Callable, NamedTuple
+from . import symmetry
+
+
+# cells are indexed as y * 4 + x: rows, columns, diagonal and off-diagonal
+BOARD_LINES = ((0, 1, 2, 3), (4, 5, 6, 7), (8, 9, 10, 11), (12, 13, 14, 15),
+               (0, 4, 8, 12), (1, 5, 9, 13), (2, 6, 10, 14), (3, 7, 11, 15),
+               (0, 5, 10, 15), (3, 6, 9, 12))
+
+# indexes of the lines (in BOARD_LINES) going through each cell
+CELL_LINES = tuple(tuple(i for i, line in enumerate(BOARD_LINES) if cell in line) for cell in range(16))
+
+
+def _winning_line_table() -> bytes:
+    '''
+    For every full line, packed as one piece index per nibble, tells whether
+    the four pieces share an attribute (AND of the bits) or share its absence (NOR)
+    '''
+    line = np.arange(1 << 16)
+    a, b, c, d = line & 15, line >> 4 & 15, line >> 8 & 15, line >> 12 & 15
+    return (((a & b & c & d) | (~(a | b | c | d) & 15)) != 0).astype(np.uint8).tobytes()
+
+
+WINNING_LINE = _winning_line_table()
+
+
+def _deadly_pieces_table() -> tuple:
+    '''
+    For every need_set | need_clear << 4, the mask of the pieces having one of
+    the attributes of need_set or lacking one of need_clear
+    '''
+    return tuple(sum(1 << piece for piece in range(16) if piece & key & 15 or ~piece & key >> 4 & 15)
+                 for key in range(256))
+
+
+DEADLY_PIECES = _deadly_pieces_table()
+
+
+def _zobrist_keys(count: int) -> tuple:
+    '''
+    Fixed pseudo-random 64-bit keys, the same in every run
+    '''
+    return tuple(np.random.default_rng(0x51A7).integers(
+        0, 1 << 64, size=count, dtype=np.uint64).tolist())
+
+
+_KEYS = _zobrist_keys(16 * 16 + 16 + 1)
+# ZOBRIST_CELLS[cell][piece], ZOBRIST_SELECTED[piece] (0 for the -1 of no selection) and the side to move.
+# The selected piece only counts while it waits to be placed: placing it removes its key
+ZOBRIST_CELLS = tuple(_KEYS[16 * cell:16 * cell + 16] for cell in range(16))
+ZOBRIST_SELECTED = _KEYS[256:272] + (0,)
+ZOBRIST_SIDE = _KEYS[272]
+
+
+_ALL_BITS = 0xFFFF
+
+
+def piece_index(piece) -> int:
+    '''
+    Validates a piece index, raising TypeError or ValueError on anything else than an int in [0, 15]
+    '''
+    piece = operator.index(piece)
+    if not 0 <= piece < 16:
+        raise ValueError(f"Invalid piece index: {piece}")
+    return piece
+
+
+@lru_cache(maxsize=None)
+def mask_bits(mask: int) -> tuple:
+    '''
+    Indexes of the bits set in a 16-bit mask, in increasing order
+    '''
+    return tuple(i for i in range(16) if mask >> i & 1)
+
+
+@lru_cache(maxsize=4096)
+def legal_move_list(empty_cells: int, free_pieces: int) -> tuple:
+    '''
+    All the moves (x, y, piece) for the given cell and piece masks, cells ordered
+    by row and pieces by index. The piece is -1 when there is none left to give
+    '''
+    cells = [cell for cell in range(16) if empty_cells >> cell & 1]
+    pieces = [piece for piece in range(16) if free_pieces >> piece & 1] or [-1]
+    return tuple((cell % 4, cell // 4, piece) for cell in cells for piece in pieces)
 
 
 class Player(object):
@@ -23,13 +111,172 @@ class Player(object):
         return self.__quarto
 
 
+class LegalRandomPlayer(Player):
+    '''
+    Random player drawing only among legal moves. rng can be the random module
+    or a random.Random instance
+    '''
+    def __init__(self, quarto, rng=random) -> None:
+        super().__init__(quarto)
+        self.rng = rng
+
+    def choose_piece(self) -> int:
+        return self.get_game().random_free_piece(self.rng)
+
+    def place_piece(self) -> tuple[int, int]:
+        return self.get_game().random_empty_cell(self.rng)
+
+
 class Piece(object):
+    '''
+    Immutable piece: the 16 instances in PIECES are shared by every game
+    '''
+    __slots__ = ('HIGH', 'COLOURED', 'SOLID', 'SQUARE')
 
     def __init__(self, high: bool, coloured: bool, solid: bool, square: bool) -> None:
-        self.HIGH = high
-        self.COLOURED = coloured
-        self.SOLID = solid
-        self.SQUARE = square
+        object.__setattr__(self, 'HIGH', high)
+        object.__setattr__(self, 'COLOURED', coloured)
+        object.__setattr__(self, 'SOLID', solid)
+        object.__setattr__(self, 'SQUARE', square)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Piece is immutable, cannot set {name}")
+
+    def __reduce__(self):
+        return (Piece, (self.HIGH, self.COLOURED, self.SOLID, self.SQUARE))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+# the index of a piece is its attribute bitmask: HIGH, COLOURED, SOLID, SQUARE from bit 3 to bit 0
+PIECE_ATTRIBUTES = np.arange(16, dtype=np.uint8)
+PIECE_ATTRIBUTES.flags.writeable = False
+PIECES = tuple(Piece(bool(bits & 8), bool(bits & 4), bool(bits & 2), bool(bits & 1))
+               for bits in PIECE_ATTRIBUTES.tolist())
+
+
+class Forfeit(Exception):
+    '''
+    Raised when a player loses the game without finishing it, e.g. by answering
+    with something that is not a move
+    '''
+    def __init__(self, player: int, reason: str = 'forfeits') -> None:
+        super().__init__(f"Player {player} {reason}")
+        self.player = player
+
+
+class TimeForfeit(Forfeit):
+    '''
+    Raised when a player runs out of its time budget
+    '''
+    def __init__(self, player: int) -> None:
+        super().__init__(player, 'ran out of time')
+
+
+class PlayerStats(object):
+    '''
+    Wall and CPU seconds of every choose_piece and place_piece call of a player,
+    their totals and the number of answers the game refused
+    '''
+    def __init__(self) -> None:
+        self.calls = {'choose_piece': [], 'place_piece': []}  # (wall, cpu) per call
+        self.invalid_moves = {'choose_piece': 0, 'place_piece': 0}
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    def timed(self, method: str, call: Callable):
+        '''
+        Call a player method, recording its times under its name
+        '''
+        wall, cpu = time.perf_counter(), time.process_time()
+        answer = call()
+        self.add(method, time.perf_counter() - wall, time.process_time() - cpu)
+        return answer
+
+    def add(self, method: str, wall: float, cpu: float):
+        '''
+        Record the times of a call timed elsewhere
+        '''
+        self.calls[method].append((wall, cpu))
+        self.wall_time += wall
+        self.cpu_time += cpu
+
+
+class GameStats(object):
+    '''
+    Per-player statistics of a game and the player who forfeited it (-1 if none)
+    '''
+    def __init__(self, players: int = 2) -> None:
+        self.players = tuple(PlayerStats() for _ in range(players))
+        self.forfeit = -1
+
+
+class GameResult(NamedTuple):
+    '''
+    Outcome of a game: the winner (-1 on a draw), the number of plies, the
+    list of moves played, as (piece, x, y), and the GameStats if the game was timed
+    '''
+    winner: int
+    plies: int
+    moves: list
+    stats: GameStats = None
+
+
+class ThreatMap(NamedTuple):
+    '''
+    Immediate threats of a position. lines holds (pieces, AND, OR) of the pieces in
+    every line of BOARD_LINES. For every cell y * 4 + x, a piece placed there completes
+    a line if it has one of the attributes of need_set or lacks one of need_clear
+    (both are 0 for occupied cells). deadly is the mask of the pieces that win somewhere
+    '''
+    lines: tuple
+    need_set: tuple
+    need_clear: tuple
+    deadly: int
+
+
+class GameObserver(object):
+    '''
+    Receives the events of Quarto.play(). Every hook does nothing by default
+    '''
+    def on_select(self, game, player: int, piece: int):
+        '''
+        player selected piece, the turn already passed to the opponent who has to place it
+        '''
+        pass
+
+    def on_place(self, game, player: int, piece: int, x: int, y: int):
+        '''
+        player placed piece in (x, y)
+        '''
+        pass
+
+    def on_invalid_move(self, game, player: int, method: str, move):
+        '''
+        The game refused the answer move of player to method ('choose_piece' or 'place_piece')
+        '''
+        pass
+
+    def on_game_end(self, game, result: GameResult):
+        '''
+        The game is over
+        '''
+        pass
+
+
+class _BoardPrinter(GameObserver):
+    '''
+    Prints the board after every selection and placement, the output of run()
+    '''
+    def on_select(self, game, player: int, piece: int):
+        game.print()
+
+    def on_place(self, game, player: int, piece: int, x: int, y: int):
+        game.print()
 
 
 class Quarto(object):
@@ -39,34 +286,39 @@ class Quarto(object):
 
     def __init__(self) -> None:
         self.__players = ()
+        self.__observers = []
         self.reset()
 
     def reset(self):
-        self._board = np.ones(
-            shape=(self.BOARD_SIDE, self.BOARD_SIDE), dtype=int) * -1
-        self.__pieces = []
-        self.__pieces.append(Piece(False, False, False, False))  # 0
-        self.__pieces.append(Piece(False, False, False, True))  # 1
-        self.__pieces.append(Piece(False, False, True, False))  # 2
-        self.__pieces.append(Piece(False, False, True, True))  # 3
-        self.__pieces.append(Piece(False, True, False, False))  # 4
-        self.__pieces.append(Piece(False, True, False, True))  # 5
-        self.__pieces.append(Piece(False, True, True, False))  # 6
-        self.__pieces.append(Piece(False, True, True, True))  # 7
-        self.__pieces.append(Piece(True, False, False, False))  # 8
-        self.__pieces.append(Piece(True, False, False, True))  # 9
-        self.__pieces.append(Piece(True, False, True, False))  # 10
-        self.__pieces.append(Piece(True, False, True, True))  # 11
-        self.__pieces.append(Piece(True, True, False, False))  # 12
-        self.__pieces.append(Piece(True, True, False, True))  # 13
-        self.__pieces.append(Piece(True, True, True, False))  # 14
-        self.__pieces.append(Piece(True, True, True, True))  # 15
+        self._board = np.full((self.BOARD_SIDE, self.BOARD_SIDE), -1, dtype=int)
+        self._occupied = 0
+        self._used_pieces = 0
         self._current_player = 0
         self.__selected_piece_index = -1
+        self._hash = 0
+        self._last_placed = -1
+        self._winning = None
+        self._previous_winning = None
+        self._threats = None
+        self._previous_threats = None
+        self._board_view = None
+        self._undo = []
 
     def set_players(self, players: tuple[Player, Player]):
         self.__players = players
 
+    def add_observer(self, observer: GameObserver):
+        '''
+        Subscribe an observer to the events of play() (kept across resets)
+        '''
+        self.__observers.append(observer)
+
+    def remove_observer(self, observer: GameObserver):
+        '''
+        Unsubscribe an observer
+        '''
+        self.__observers.remove(observer)
+
     def get_current_player(self) -> int:
         '''
         Gets the current player
@@ -75,9 +327,12 @@ class Quarto(object):
 
     def select(self, pieceIndex: int) -> bool:
         '''
-        select a piece. Returns True on success
+        select a piece. Returns True on success, False if the piece is already on
+        the board. Raises ValueError if pieceIndex is not a piece
         '''
-        if pieceIndex not in self._board:
+        pieceIndex = piece_index(pieceIndex)
+        if not self._used_pieces >> pieceIndex & 1:
+            self._hash ^= ZOBRIST_SELECTED[self._pending_piece()] ^ ZOBRIST_SELECTED[pieceIndex]
             self.__selected_piece_index = pieceIndex
             return True
         return False
@@ -86,13 +341,127 @@ class Quarto(object):
         '''
         Place piece in coordinates (x, y). Returns true on success
         '''
-        if self.__placeable(x, y):
-            self._board[y, x] = self.__selected_piece_index
+        piece = self.__selected_piece_index
+        if self.__placeable(x, y) and piece >= 0 and not self._used_pieces >> piece & 1:
+            cell = y * 4 + x
+            self._board[y, x] = piece
+            self._occupied |= 1 << cell
+            self._used_pieces |= 1 << piece
+            self._hash ^= ZOBRIST_CELLS[cell][piece] ^ ZOBRIST_SELECTED[piece]
+            self._placed(cell)
             return True
         return False
 
+    def set_board(self, board: np.ndarray):
+        '''
+        Replace the board, rebuilding everything derived from it. The selected piece
+        and the current player are kept, the undo stack is cleared
+        '''
+        self._board = board
+        self._occupied, self._used_pieces, self._hash = 0, 0, 0
+        for cell, piece in enumerate(board.ravel().tolist()):
+            if piece >= 0:
+                self._occupied |= 1 << cell
+                self._used_pieces |= 1 << piece
+                self._hash ^= ZOBRIST_CELLS[cell][piece]
+        self._hash ^= ZOBRIST_SELECTED[self._pending_piece()]
+        self._last_placed = -1
+        self._winning = None
+        self._previous_winning = None
+        self._threats = None
+        self._previous_threats = None
+        self._undo = []
+
+    def _placed(self, cell: int):
+        '''
+        Remember the last placement and drop the cached winner check and threats
+        '''
+        self._last_placed = cell
+        self._previous_winning = self._winning
+        self._winning = None
+        self._previous_threats = self._threats
+        self._threats = None
+
+    def _pending_piece(self) -> int:
+        '''
+        The selected piece if it is not on the board yet, -1 otherwise
+        '''
+        piece = self.get_selected_piece()
+        return piece if piece >= 0 and not self._used_pieces >> piece & 1 else -1
+
+    def _piece_at(self, cell: int) -> int:
+        '''
+        Piece in cell y * 4 + x, -1 if empty
+        '''
+        return self._board.item(cell)
+
     def __placeable(self, x: int, y: int) -> bool:
-        return not (y < 0 or x < 0 or x > 3 or y > 3 or self._board[y, x] >= 0)
+        return not (y < 0 or x < 0 or x > 3 or y > 3 or self._occupied >> (y * 4 + x) & 1)
+
+    def push(self, piece: int, x: int, y: int) -> bool:
+        '''
+        Play a whole ply in place, as run() does: the current player selects the piece
+        and the opponent places it in (x, y). Returns True on success, the ply can be
+        undone with pop()
+        '''
+        if not self.__placeable(x, y):
+            return False
+        state = (self.__selected_piece_index, self._current_player, self._hash,
+                 self._last_placed, self._winning, self._previous_winning,
+                 self._threats, self._previous_threats)
+        if not self.select(piece):
+            return False
+        self._current_player = (self._current_player + 1) % self.MAX_PLAYERS
+        self.place(x, y)
+        self._undo.append((piece, x, y, state))
+        return True
+
+    def pop(self) -> tuple:
+        '''
+        Undo the last push(), restoring selected piece, current player, cached
+        winner and threats. Returns the undone move as (piece, x, y)
+        '''
+        piece, x, y, state = self._undo.pop()
+        self._board[y, x] = -1
+        self._occupied &= ~(1 << (y * 4 + x))
+        self._used_pieces &= ~(1 << piece)
+        (self.__selected_piece_index, self._current_player, self._hash,
+         self._last_placed, self._winning, self._previous_winning,
+         self._threats, self._previous_threats) = state
+        return piece, x, y
+
+    def copy_state(self, into: 'Quarto') -> 'Quarto':
+        '''
+        Copy the position (board, masks, selected piece, current player, hash and cached
+        checks) into another game of the same engine, reusing its board buffer. Its players
+        and observers are kept, its undo stack is cleared. Returns into
+        '''
+        if into is self:
+            return into
+        board = getattr(into, '_board', None)
+        if board is None:
+            into._board = self._board.copy()
+            into._board_view = None
+        else:
+            np.copyto(board, self._board)
+        (into._occupied, into._used_pieces, into._current_player, into.__selected_piece_index,
+         into._hash, into._last_placed, into._winning, into._previous_winning,
+         into._threats, into._previous_threats) = (
+            self._occupied, self._used_pieces, self._current_player, self.__selected_piece_index,
+            self._hash, self._last_placed, self._winning, self._previous_winning,
+            self._threats, self._previous_threats)
+        into._undo = []
+        return into
+
+    def fork(self) -> 'Quarto':
+        '''
+        A new game of the same engine in the same position, without players, observers
+        and undo stack. It is built without running __init__ and reset()
+        '''
+        game = self.__class__.__new__(self.__class__)
+        game.__players = ()
+        game.__observers = []
+        return self.copy_state(game)
 
     def print(self):
         '''
@@ -110,202 +479,314 @@ class Quarto(object):
         '''
         Gets charachteristics of a piece (index-based)
         '''
-        return copy.deepcopy(self.__pieces[index])
+        return PIECES[index]
 
     def get_board_status(self) -> np.ndarray:
         '''
-        Get the current board status (pieces are represented by index)
+        Get a copy of the current board status (pieces are represented by index)
         '''
-        return copy.deepcopy(self._board)
+        return self._board.copy()
+
+    def get_board_view(self) -> np.ndarray:
+        '''
+        Get a read-only view of the board, without copying it. The view follows
+        the game as pieces are placed and undone, on every engine, until reset() or
+        set_board() start a new board: use get_board_status() to keep a snapshot
+        '''
+        if self._board_view is None or self._board_view.base is not self._board:
+            self._board_view = self._board.view()
+            self._board_view.flags.writeable = False
+        return self._board_view
 
     def get_selected_piece(self) -> int:
         '''
         Get index of selected piece
         '''
-        return copy.deepcopy(self.__selected_piece_index)
-
-    def __check_horizontal(self) -> int:
-        for i in range(self.BOARD_SIDE):
-            high_values = [
-                elem for elem in self._board[i] if elem >= 0 and self.__pieces[elem].HIGH
-            ]
-            coloured_values = [
-                elem for elem in self._board[i] if elem >= 0 and self.__pieces[elem].COLOURED
-            ]
-            solid_values = [
-                elem for elem in self._board[i] if elem >= 0 and self.__pieces[elem].SOLID
-            ]
-            square_values = [
-                elem for elem in self._board[i] if elem >= 0 and self.__pieces[elem].SQUARE
-            ]
-            low_values = [
-                elem for elem in self._board[i] if elem >= 0 and not self.__pieces[elem].HIGH
-            ]
-            noncolor_values = [
-                elem for elem in self._board[i] if elem >= 0 and not self.__pieces[elem].COLOURED
-            ]
-            hollow_values = [
-                elem for elem in self._board[i] if elem >= 0 and not self.__pieces[elem].SOLID
-            ]
-            circle_values = [
-                elem for elem in self._board[i] if elem >= 0 and not self.__pieces[elem].SQUARE
-            ]
-            if len(high_values) == self.BOARD_SIDE or len(
-                    coloured_values
-            ) == self.BOARD_SIDE or len(solid_values) == self.BOARD_SIDE or len(
-                    square_values) == self.BOARD_SIDE or len(low_values) == self.BOARD_SIDE or len(
-                        noncolor_values) == self.BOARD_SIDE or len(
-                            hollow_values) == self.BOARD_SIDE or len(
-                                circle_values) == self.BOARD_SIDE:
-                return self._current_player
-        return -1
-
-    def __check_vertical(self):
-        for i in range(self.BOARD_SIDE):
-            high_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and self.__pieces[elem].HIGH
-            ]
-            coloured_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and self.__pieces[elem].COLOURED
-            ]
-            solid_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and self.__pieces[elem].SOLID
-            ]
-            square_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and self.__pieces[elem].SQUARE
-            ]
-            low_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and not self.__pieces[elem].HIGH
-            ]
-            noncolor_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and not self.__pieces[elem].COLOURED
-            ]
-            hollow_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and not self.__pieces[elem].SOLID
-            ]
-            circle_values = [
-                elem for elem in self._board[:, i] if elem >= 0 and not self.__pieces[elem].SQUARE
-            ]
-            if len(high_values) == self.BOARD_SIDE or len(
-                    coloured_values
-            ) == self.BOARD_SIDE or len(solid_values) == self.BOARD_SIDE or len(
-                    square_values) == self.BOARD_SIDE or len(low_values) == self.BOARD_SIDE or len(
-                        noncolor_values) == self.BOARD_SIDE or len(
-                            hollow_values) == self.BOARD_SIDE or len(
-                                circle_values) == self.BOARD_SIDE:
-                return self._current_player
-        return -1
-
-    def __check_diagonal(self):
-        high_values = []
-        coloured_values = []
-        solid_values = []
-        square_values = []
-        low_values = []
-        noncolor_values = []
-        hollow_values = []
-        circle_values = []
-        for i in range(self.BOARD_SIDE):
-            if self._board[i, i] < 0:
-                break
-            if self.__pieces[self._board[i, i]].HIGH:
-                high_values.append(self._board[i, i])
-            else:
-                low_values.append(self._board[i, i])
-            if self.__pieces[self._board[i, i]].COLOURED:
-                coloured_values.append(self._board[i, i])
-            else:
-                noncolor_values.append(self._board[i, i])
-            if self.__pieces[self._board[i, i]].SOLID:
-                solid_values.append(self._board[i, i])
-            else:
-                hollow_values.append(self._board[i, i])
-            if self.__pieces[self._board[i, i]].SQUARE:
-                square_values.append(self._board[i, i])
-            else:
-                circle_values.append(self._board[i, i])
-        if len(high_values) == self.BOARD_SIDE or len(coloured_values) == self.BOARD_SIDE or len(
-                solid_values) == self.BOARD_SIDE or len(square_values) == self.BOARD_SIDE or len(
-                    low_values
-        ) == self.BOARD_SIDE or len(noncolor_values) == self.BOARD_SIDE or len(
-                    hollow_values) == self.BOARD_SIDE or len(circle_values) == self.BOARD_SIDE:
-            return self._current_player
-        high_values = []
-        coloured_values = []
-        solid_values = []
-        square_values = []
-        low_values = []
-        noncolor_values = []
-        hollow_values = []
-        circle_values = []
-        for i in range(self.BOARD_SIDE):
-            if self._board[i, self.BOARD_SIDE - 1 - i] < 0:
-                break
-            if self.__pieces[self._board[i, self.BOARD_SIDE - 1 - i]].HIGH:
-                high_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
-            else:
-                low_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
-            if self.__pieces[self._board[i, self.BOARD_SIDE - 1 - i]].COLOURED:
-                coloured_values.append(
-                    self._board[i, self.BOARD_SIDE - 1 - i])
-            else:
-                noncolor_values.append(
-                    self._board[i, self.BOARD_SIDE - 1 - i])
-            if self.__pieces[self._board[i, self.BOARD_SIDE - 1 - i]].SOLID:
-                solid_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
+        return self.__selected_piece_index
+
+    def _has_winning_line(self, lines: tuple) -> bool:
+        '''
+        Tells whether one of the given lines (indexes in BOARD_LINES) is a winning one
+        '''
+        board = self._board.ravel().tolist()
+        for line in lines:
+            i, j, k, l = BOARD_LINES[line]
+            a, b, c, d = board[i], board[j], board[k], board[l]
+            if a >= 0 and b >= 0 and c >= 0 and d >= 0 and WINNING_LINE[a | b << 4 | c << 8 | d << 12]:
+                return True
+        return False
+
+    def pack(self) -> tuple:
+        '''
+        The board packed as in BitboardQuarto: (cells, occupied, used pieces) where the piece
+        of cell y * 4 + x is in nibble y * 4 + x of cells
+        '''
+        cells = 0
+        for cell, piece in enumerate(self._board.ravel().tolist()):
+            if piece >= 0:
+                cells |= piece << 4 * cell
+        return cells, self._occupied, self._used_pieces
+
+    def legal_moves(self) -> tuple:
+        '''
+        Masks of the legal moves: bit (y * 4 + x) of the first one is set for every
+        empty cell, bit i of the second one for every piece that is neither on the
+        board nor selected
+        '''
+        free_pieces = ~self._used_pieces & _ALL_BITS
+        selected = self.get_selected_piece()
+        if selected >= 0:
+            free_pieces &= ~(1 << selected)
+        return ~self._occupied & _ALL_BITS, free_pieces
+
+    def legal_move_list(self) -> tuple:
+        '''
+        All the moves (x, y, piece) from the current position: place the selected
+        piece in (x, y) and give piece to the opponent (-1 if none is left).
+        The tuple is shared, do not modify it
+        '''
+        return legal_move_list(*self.legal_moves())
+
+    def random_empty_cell(self, rng=random) -> tuple[int, int]:
+        '''
+        Uniformly chosen empty cell as (x, y), (-1, -1) if the board is full.
+        rng can be the random module or a random.Random instance
+        '''
+        cells = mask_bits(self.legal_moves()[0])
+        if not cells:
+            return -1, -1
+        cell = cells[rng.randrange(len(cells))]
+        return cell % 4, cell // 4
+
+    def random_free_piece(self, rng=random) -> int:
+        '''
+        Uniformly chosen piece that is neither on the board nor selected, -1 if none is left.
+        rng can be the random module or a random.Random instance
+        '''
+        pieces = mask_bits(self.legal_moves()[1])
+        return pieces[rng.randrange(len(pieces))] if pieces else -1
+
+    def hash(self) -> int:
+        '''
+        64-bit Zobrist hash of the position (pieces on the board, selected piece still
+        to be placed and side to move), kept up to date by select, place and pop
+        '''
+        return self._hash ^ ZOBRIST_SIDE if self._current_player else self._hash
+
+    def canonicalize(self) -> tuple:
+        '''
+        Key of the canonical representative of the current position under the Quarto
+        symmetries and the Symmetry that maps the position (and its moves) onto it.
+        As for hash(), a selected piece that is already on the board is ignored
+        '''
+        return symmetry.canonicalize(self.get_board_view(), self._pending_piece())
+
+    def check_winner(self, last_move_only: bool = False) -> int:
+        '''
+        Check who is the winner. The result is cached until the next placement.
+        When the position before the last placement had no winning line, only the
+        lines through the last placed cell are checked; last_move_only forces
+        that check even if the previous position was never checked
+        '''
+        if self._winning is None:
+            if self._previous_winning:
+                self._winning = True
+            elif self._last_placed >= 0 and (last_move_only or self._previous_winning is not None):
+                self._winning = self._has_winning_line(CELL_LINES[self._last_placed])
             else:
-                hollow_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
-            if self.__pieces[self._board[i, self.BOARD_SIDE - 1 - i]].SQUARE:
-                square_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
+                self._winning = self._has_winning_line(range(len(BOARD_LINES)))
+        return self._current_player if self._winning else -1
+
+    def __line_threat(self, line: int) -> tuple:
+        pieces, both, either = 0, 15, 0
+        for cell in BOARD_LINES[line]:
+            piece = self._piece_at(cell)
+            if piece >= 0:
+                pieces += 1
+                both &= piece
+                either |= piece
+        return pieces, both, either
+
+    def threats(self) -> ThreatMap:
+        '''
+        The ThreatMap of the position. It is cached until the next placement and,
+        when the position before it was mapped, only the lines through the last
+        placed cell are recomputed
+        '''
+        if self._threats is None:
+            previous = self._previous_threats
+            if previous is not None and self._last_placed >= 0:
+                lines = list(previous.lines)
+                for line in CELL_LINES[self._last_placed]:
+                    lines[line] = self.__line_threat(line)
+                cells = {cell for line in CELL_LINES[self._last_placed] for cell in BOARD_LINES[line]}
+                need_set, need_clear = list(previous.need_set), list(previous.need_clear)
             else:
-                circle_values.append(self._board[i, self.BOARD_SIDE - 1 - i])
-        if len(high_values) == self.BOARD_SIDE or len(coloured_values) == self.BOARD_SIDE or len(
-                solid_values) == self.BOARD_SIDE or len(square_values) == self.BOARD_SIDE or len(
-                    low_values
-        ) == self.BOARD_SIDE or len(noncolor_values) == self.BOARD_SIDE or len(
-                    hollow_values) == self.BOARD_SIDE or len(circle_values) == self.BOARD_SIDE:
-            return self._current_player
-        return -1
-
-    def check_winner(self) -> int:
-        '''
-        Check who is the winner
-        '''
-        l = [self.__check_horizontal(), self.__check_vertical(),
-             self.__check_diagonal()]
-        for elem in l:
-            if elem >= 0:
-                return elem
-        return -1
+                lines = [self.__line_threat(line) for line in range(len(BOARD_LINES))]
+                cells = range(16)
+                need_set, need_clear = [0] * 16, [0] * 16
+            for cell in cells:
+                cell_set = cell_clear = 0
+                if not self._occupied >> cell & 1:
+                    for line in CELL_LINES[cell]:
+                        pieces, both, either = lines[line]
+                        if pieces == 3:
+                            cell_set |= both
+                            cell_clear |= ~either & 15
+                need_set[cell], need_clear[cell] = cell_set, cell_clear
+            any_set = any_clear = 0
+            for cell_set, cell_clear in zip(need_set, need_clear):
+                any_set |= cell_set
+                any_clear |= cell_clear
+            self._threats = ThreatMap(tuple(lines), tuple(need_set), tuple(need_clear),
+                                      DEADLY_PIECES[any_set | any_clear << 4])
+        return self._threats
+
+    def winning_attributes(self, x: int, y: int) -> tuple:
+        '''
+        (need_set, need_clear) attribute masks of cell (x, y): a piece placed there
+        wins if it has one of need_set or lacks one of need_clear
+        '''
+        threats = self.threats()
+        return threats.need_set[y * 4 + x], threats.need_clear[y * 4 + x]
+
+    def winning_cells(self, piece: int) -> int:
+        '''
+        Mask of the empty cells (bit y * 4 + x) where placing piece completes a line,
+        whether or not the piece is still free
+        '''
+        threats = self.threats()
+        cells = 0
+        for cell in range(16):
+            if DEADLY_PIECES[threats.need_set[cell] | threats.need_clear[cell] << 4] >> piece & 1:
+                cells |= 1 << cell
+        return cells
+
+    def deadly_pieces(self) -> int:
+        '''
+        Mask of the pieces, neither on the board nor selected, that the opponent
+        could place to complete a line
+        '''
+        return self.threats().deadly & self.legal_moves()[1]
 
     def check_finished(self) -> bool:
         '''
         Check who is the loser
         '''
-        for row in self._board:
-            for elem in row:
-                if elem == -1:
-                    return False
-        return True
+        return self._occupied == _ALL_BITS
+
+    def __ask(self, method: str, stats: GameStats, budgets: tuple):
+        '''
+        Call choose_piece or place_piece of the current player, timing it when stats are kept
+        '''
+        player = self._current_player
+        if stats is None:
+            return getattr(self.__players[player], method)()
+        answer = stats.players[player].timed(method, getattr(self.__players[player], method))
+        if budgets is not None and stats.players[player].wall_time > budgets[player]:
+            raise TimeForfeit(player)
+        return answer
+
+    def play(self, on_move: Callable = None, recorder=None, timed: bool = False, time_budget=None) -> GameResult:
+        '''
+        Run the game without any output. If given, on_move(game, piece, x, y)
+        is called after every placement and the game is written to recorder
+        (e.g. a records.GameWriter) once over.
+        With timed, or with a time_budget (wall seconds for the whole game, one
+        number or a sequence of one per player), every choose_piece and
+        place_piece call is timed and the result carries the GameStats. A player
+        going over its budget, or answering with something that is not a piece or
+        a cell, loses the game
+        '''
+        stats = GameStats(self.MAX_PLAYERS) if timed or time_budget is not None else None
+        budgets = time_budget
+        if isinstance(time_budget, numbers.Real):
+            budgets = (time_budget,) * self.MAX_PLAYERS
+        elif time_budget is not None:
+            budgets = tuple(time_budget)
+            if len(budgets) != self.MAX_PLAYERS:
+                raise ValueError(f"time_budget needs one number per player, got {time_budget}")
+        plies = self._plies(stats, on_move, recorder)
+        try:
+            method = next(plies)
+            while True:
+                try:
+                    answer = self.__ask(method, stats, budgets)
+                except TimeForfeit as forfeit:
+                    method = plies.throw(forfeit)
+                else:
+                    method = plies.send(answer)
+        except StopIteration as end:
+            return end.value
+
+    def _plies(self, stats: GameStats = None, on_move: Callable = None, recorder=None):
+        '''
+        The rules of play() as a generator, so that other runners (e.g. the asynchronous
+        server.play_game) share them: it yields the method ('choose_piece' or 'place_piece')
+        the current player has to answer and is sent the answer. Throwing a Forfeit into
+        it ends the game, as does an answer that is not a piece or a cell. The GameResult
+        is the value of its StopIteration. Invalid moves, the forfeit and the observers,
+        on_move and recorder are handled as in play()
+        '''
+        observers = self.__observers
+        winner = -1
+        moves = []
+        try:
+            while winner < 0 and not self.check_finished():
+                piece_ok = False
+                while not piece_ok:
+                    piece = yield 'choose_piece'
+                    try:
+                        piece_ok = self.select(piece)
+                    except (TypeError, ValueError):
+                        raise Forfeit(self._current_player, f"chose {piece!r}, which is not a piece")
+                    if not piece_ok:
+                        if stats is not None:
+                            stats.players[self._current_player].invalid_moves['choose_piece'] += 1
+                        for observer in observers:
+                            observer.on_invalid_move(self, self._current_player, 'choose_piece', piece)
+                piece_ok = False
+                self._current_player = (
+                    self._current_player + 1) % self.MAX_PLAYERS
+                for observer in observers:
+                    observer.on_select(self, 1 - self._current_player, piece)
+                while not piece_ok:
+                    answer = yield 'place_piece'
+                    try:
+                        x, y = answer
+                        piece_ok = self.place(x, y)
+                    except (TypeError, ValueError):
+                        raise Forfeit(self._current_player, f"placed in {answer!r}, which is not a cell")
+                    if not piece_ok:
+                        if stats is not None:
+                            stats.players[self._current_player].invalid_moves['place_piece'] += 1
+                        for observer in observers:
+                            observer.on_invalid_move(self, self._current_player, 'place_piece', (x, y))
+                moves.append((piece, x, y))
+                for observer in observers:
+                    observer.on_place(self, self._current_player, piece, x, y)
+                if on_move is not None:
+                    on_move(self, piece, x, y)
+                winner = self.check_winner()
+        except Forfeit as forfeit:
+            if stats is not None:
+                stats.forfeit = forfeit.player
+            winner = (forfeit.player + 1) % self.MAX_PLAYERS
+        result = GameResult(winner, len(moves), moves, stats)
+        if recorder is not None:
+            recorder.write(result)
+        for observer in observers:
+            observer.on_game_end(self, result)
+        return result
 
     def run(self) -> int:
         '''
         Run the game (with output for every move)
         '''
-        winner = -1
-        while winner < 0 and not self.check_finished():
-            self.print()
-            piece_ok = False
-            while not piece_ok:
-                piece_ok = self.select(
-                    self.__players[self._current_player].choose_piece())
-            piece_ok = False
-            self._current_player = (
-                self._current_player + 1) % self.MAX_PLAYERS
-            self.print()
-            while not piece_ok:
-                x, y = self.__players[self._current_player].place_piece()
-                piece_ok = self.place(x, y)
-            winner = self.check_winner()
+        printer = _BoardPrinter()
         self.print()
-        return winner
\ No newline at end of file
+        self.add_observer(printer)
+        try:
+            return self.play().winner
+        finally:
+            self.remove_observer(printer)
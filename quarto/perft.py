@@ -0,0 +1,85 @@
+import argparse
+import logging
+import random
+import time
+from .objects import Quarto, mask_bits
+from .bitboard import BitboardQuarto
+
+
+ENGINES = (Quarto, BitboardQuarto)
+
+
+def perft(game: Quarto, depth: int) -> int:
+    '''
+    Number of positions reached after depth plies from the current one, where a ply
+    places a piece that is neither on the board nor selected in an empty cell (as
+    push() does) and won or full boards have no plies. The game is left unchanged
+    '''
+    if depth == 0:
+        return 1
+    if game.check_winner() >= 0 or game.check_finished():
+        return 0
+    cells, pieces = game.legal_moves()
+    cells, pieces = mask_bits(cells), mask_bits(pieces)
+    if depth == 1:
+        return len(cells) * len(pieces)
+    nodes = 0
+    for piece in pieces:
+        for cell in cells:
+            game.push(piece, cell % 4, cell // 4)
+            nodes += perft(game, depth - 1)
+            game.pop()
+    return nodes
+
+
+def random_opening(plies: int, seed: int = None) -> list:
+    '''
+    Random legal moves (piece, x, y) from the empty board, stopping early on a win
+    '''
+    rng = random.Random(seed)
+    game = Quarto()
+    moves = []
+    for _ in range(plies):
+        if game.check_winner() >= 0 or game.check_finished():
+            break
+        move = (game.random_free_piece(rng),) + game.random_empty_cell(rng)
+        game.push(*move)
+        moves.append(move)
+    return moves
+
+
+def compare_engines(depth: int, moves: list = (), engines: tuple = ENGINES) -> list:
+    '''
+    Run perft with every engine from the position reached by moves. Returns a list of
+    (engine name, nodes, seconds, nodes per second) and raises AssertionError if the
+    engines disagree on the number of nodes
+    '''
+    results = []
+    for engine in engines:
+        game = engine()
+        for move in moves:
+            game.push(*move)
+        start = time.perf_counter()
+        nodes = perft(game, depth)
+        seconds = time.perf_counter() - start
+        results.append((engine.__name__, nodes, seconds, nodes / seconds if seconds > 0 else float('inf')))
+    if len({nodes for _, nodes, _, _ in results}) > 1:
+        raise AssertionError(f"perft({depth}) mismatch: {results}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count perft nodes and compare the Quarto engines')
+    parser.add_argument('-d', '--depth', type=int, default=3, help='number of plies to enumerate')
+    parser.add_argument('-p', '--plies', type=int, default=0, help='random plies played before counting')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='seed of the random plies')
+    args = parser.parse_args()
+
+    moves = random_opening(args.plies, args.seed)
+    logging.warning(f"perft: opening {moves}")
+    for name, nodes, seconds, speed in compare_engines(args.depth, moves):
+        logging.warning(f"perft: {name} depth {args.depth}: {nodes} nodes in {seconds:.3f}s ({speed:.0f} nodes/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import os
+import numpy as np
+from .objects import ZOBRIST_CELLS, ZOBRIST_SELECTED, ZOBRIST_SIDE, Quarto
+
+
+# one position per record: the board packed as in BitboardQuarto (piece of cell y * 4 + x in
+# nibble y * 4 + x of cells, occupied cells mask), pieces on the board, selected piece, side
+# to move and a free outcome label (e.g. the winner of the game, -1 on a draw)
+POSITION_DTYPE = np.dtype([('cells', '<u8'), ('occupied', '<u2'), ('used', '<u2'),
+                           ('selected', 'i1'), ('player', 'u1'), ('outcome', 'i1')])
+
+
+def pack_position(game: Quarto, outcome: int = -1) -> np.ndarray:
+    '''
+    Single POSITION_DTYPE record of the current position of a game
+    '''
+    record = np.zeros(1, dtype=POSITION_DTYPE)
+    record[0] = game.pack() + (game.get_selected_piece(), game.get_current_player(), outcome)
+    return record
+
+
+_CELL_KEYS = np.array(ZOBRIST_CELLS, dtype=np.uint64)
+_SELECTED_KEYS = np.array(ZOBRIST_SELECTED, dtype=np.uint64)
+_SIDE_KEYS = np.array((0, ZOBRIST_SIDE), dtype=np.uint64)
+_CHUNK = 1 << 20
+# the index file starts with _INDEX_MAGIC and the number of records it covers, the log of
+# the keys added since then with the number of records the index covered when it was started
+_INDEX_MAGIC = int.from_bytes(b'QIDX\x00\x00\x00\x02', 'little')
+_MERGE_MIN = 1 << 16
+
+
+def position_keys(records: np.ndarray) -> np.ndarray:
+    '''
+    Dedupe keys of the records: the Zobrist hash of board, selected piece still to be
+    placed and side to move, equal to Quarto.hash() of the position
+    '''
+    cells, occupied = records['cells'], records['occupied']
+    selected = records['selected'].astype(np.intp)
+    pending = (selected >= 0) & (records['used'] >> np.maximum(selected, 0) & 1 == 0)
+    keys = _SELECTED_KEYS[np.where(pending, selected, -1)] ^ _SIDE_KEYS[records['player'] & 1]
+    for cell in range(16):
+        pieces = (cells >> np.uint64(4 * cell) & np.uint64(15)).astype(np.intp)
+        keys ^= np.where(occupied >> cell & 1 == 1, _CELL_KEYS[cell][pieces], np.uint64(0))
+    return keys
+
+
+def _unique_keys(records: np.ndarray) -> np.ndarray:
+    '''
+    Sorted distinct keys of the records, computed a chunk at a time
+    '''
+    chunks = [np.unique(position_keys(records[start:start + _CHUNK])) for start in range(0, len(records), _CHUNK)]
+    return np.unique(np.concatenate(chunks)) if chunks else np.zeros(0, dtype=np.uint64)
+
+
+def _contains(index: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    '''
+    Mask of the keys found in the sorted index
+    '''
+    if len(index) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    found = np.searchsorted(index, keys)
+    return index[np.minimum(found, len(index) - 1)] == keys
+
+
+class PositionStore(object):
+    '''
+    Positions stored on disk as a flat array of POSITION_DTYPE records and mapped in
+    memory, so that they are read without loading or copying the file. The dedupe
+    index is kept in two files: path + '.index', the sorted keys of the records up to
+    a count, memory-mapped, and path + '.index.log', the keys of the records appended
+    since then (one per record). Deduped appends only add to the log and to sorted runs
+    kept in memory, the index file is rewritten once the log holds an eighth of its keys.
+    Plain appends are caught up with at the next deduped one. One writer at a time
+    '''
+    def __init__(self, path: str) -> None:
+        self.__path = path
+        self.__index_path = path + '.index'
+        self.__log_path = path + '.index.log'
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        self.__positions = None
+        self.__base = None
+        self.__runs = []
+        self.__logged = 0
+        self.__covered = 0
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.__path) // POSITION_DTYPE.itemsize
+
+    def positions(self) -> np.ndarray:
+        '''
+        Read-only memory-mapped array of all the stored positions
+        '''
+        if self.__positions is None or len(self.__positions) != len(self):
+            if len(self) == 0:
+                return np.zeros(0, dtype=POSITION_DTYPE)
+            self.__positions = np.memmap(self.__path, dtype=POSITION_DTYPE, mode='r', shape=(len(self),))
+        return self.__positions
+
+    def __load_index(self):
+        '''
+        Map the index file and read the log, dropping them if they do not fit the store
+        '''
+        covered, base, log = 0, np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+        if os.path.exists(self.__index_path) and os.path.getsize(self.__index_path) >= 16:
+            mapped = np.memmap(self.__index_path, dtype=np.uint64, mode='r')
+            if int(mapped[0]) == _INDEX_MAGIC:
+                covered, base = int(mapped[1]), mapped[2:]
+        if os.path.exists(self.__log_path) and os.path.getsize(self.__log_path) >= 8:
+            log = np.fromfile(self.__log_path, dtype=np.uint64)
+            # a log started for another index was merged into this one or is lost
+            log = log[1:] if int(log[0]) == covered else log[:0]
+        if covered + len(log) > len(self):
+            # the store was replaced: the index belongs to other positions
+            covered, base, log = 0, np.zeros(0, dtype=np.uint64), log[:0]
+        self.__base, self.__covered = base, covered
+        self.__runs, self.__logged = [], 0
+        self.__start_log()
+        if len(log):
+            keys = np.unique(log)
+            self.__log(keys[~self.__contains(keys)], log)
+
+    def __start_log(self):
+        with open(self.__log_path, 'wb') as file:
+            file.write(np.uint64(self.__covered).tobytes())
+
+    def __log(self, keys: np.ndarray, records: np.ndarray):
+        '''
+        Add the sorted keys new to the index, records holding the keys of the records
+        they come from. Rewrites the index file once the log is large enough
+        '''
+        with open(self.__log_path, 'ab') as file:
+            file.write(records.tobytes())
+        self.__covered += len(records)
+        self.__logged += len(keys)
+        runs = self.__runs
+        runs.append(keys)
+        # sorted runs of decreasing sizes, a few for any number of keys
+        while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+            last = runs.pop()
+            runs[-1] = np.union1d(runs[-1], last)
+        if self.__logged > max(_MERGE_MIN, len(self.__base) // 8):
+            self.__merge()
+
+    def __merge(self, keys: np.ndarray = None, covered: int = None):
+        '''
+        Rewrite the index file with the logged keys and sorted keys of the records up to covered
+        '''
+        runs = self.__runs + ([keys] if keys is not None else [])
+        keys = runs[0] if len(runs) == 1 else np.unique(np.concatenate(runs))
+        keys = keys[~_contains(self.__base, keys)]
+        index = np.insert(self.__base, np.searchsorted(self.__base, keys), keys)
+        # a mapped file cannot be replaced on Windows
+        self.__base = None
+        self.__covered = self.__covered if covered is None else covered
+        with open(self.__index_path + '.tmp', 'wb') as file:
+            file.write(np.array((_INDEX_MAGIC, self.__covered), dtype=np.uint64).tobytes())
+            file.write(index.tobytes())
+        os.replace(self.__index_path + '.tmp', self.__index_path)
+        self.__start_log()
+        self.__base, self.__runs, self.__logged = index, [], 0
+
+    def __contains(self, keys: np.ndarray) -> np.ndarray:
+        '''
+        Mask of the keys already in the index
+        '''
+        found = _contains(self.__base, keys)
+        for run in self.__runs:
+            found |= _contains(run, keys)
+        return found
+
+    def __catch_up(self):
+        '''
+        Load the index on first use and add the keys of the records appended without it
+        '''
+        if self.__base is None or self.__covered > len(self):
+            self.__load_index()
+        positions = self.positions()
+        if self.__covered < len(positions):
+            tail = positions[self.__covered:]
+            if len(tail) > max(_MERGE_MIN, len(self.__base) // 8):
+                self.__merge(_unique_keys(tail), len(positions))
+            else:
+                records = position_keys(tail)
+                keys = np.unique(records)
+                self.__log(keys[~self.__contains(keys)], records)
+
+    def append(self, records: np.ndarray, dedupe: bool = False) -> int:
+        '''
+        Append POSITION_DTYPE records at the end of the store. With dedupe, records whose
+        board, selected piece still to be placed and side to move are already stored (or
+        repeated) are skipped. Returns the number of records written
+        '''
+        records = np.asarray(records, dtype=POSITION_DTYPE)
+        if dedupe:
+            self.__catch_up()
+            keys = position_keys(records)
+            unique, first = np.unique(keys, return_index=True)
+            first = np.sort(first[~self.__contains(unique)])
+            records, keys = records[first], keys[first]
+        with open(self.__path, 'ab') as file:
+            file.write(records.tobytes())
+        if dedupe:
+            self.__log(np.sort(keys), keys)
+        return len(records)
+
+    def add(self, game: Quarto, outcome: int = -1, dedupe: bool = False) -> bool:
+        '''
+        Append the current position of a game. Returns False if deduped away
+        '''
+        return self.append(pack_position(game, outcome), dedupe) == 1
+
+    def filter(self, **conditions) -> np.ndarray:
+        '''
+        Positions whose fields equal the given values, e.g. filter(outcome=1, player=0)
+        '''
+        positions = self.positions()
+        selected = np.ones(len(positions), dtype=bool)
+        for field, value in conditions.items():
+            selected &= positions[field] == value
+        return positions[selected]
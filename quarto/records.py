@@ -0,0 +1,94 @@
+import mmap
+import os
+import struct
+from typing import Iterator, NamedTuple
+from .objects import GameObserver, GameResult, Quarto
+
+
+# file: magic and version, then the games one after the other. Every game is a header
+# (ids of the two agents, seed, winner, number of plies) followed by one byte per ply,
+# the piece in the high nibble and the cell (y * 4 + x) in the low one
+MAGIC = b'QRTO\x01'
+_GAME_HEADER = struct.Struct('<HHQbB')
+
+
+class GameRecord(NamedTuple):
+    '''
+    A recorded game: ids of the agents, seed, winner (-1 on a draw) and the
+    moves as (piece, x, y)
+    '''
+    agents: tuple
+    seed: int
+    winner: int
+    moves: tuple
+
+
+class GameWriter(GameObserver):
+    '''
+    Appends games to a record file, flushing every game so that read_games() sees it.
+    Can be given to Quarto.play() as recorder or subscribed to a game with
+    Quarto.add_observer()
+    '''
+    def __init__(self, path: str, agents: tuple = (0, 0), seed: int = 0) -> None:
+        self.agents = agents
+        self.seed = seed
+        self.__file = open(path, 'ab')
+        if self.__file.tell() == 0:
+            self.__file.write(MAGIC)
+            self.__file.flush()
+
+    def write(self, result: GameResult, agents: tuple = None, seed: int = None):
+        '''
+        Append a game, with the writer agents and seed unless others are given
+        '''
+        agents = self.agents if agents is None else agents
+        seed = self.seed if seed is None else seed
+        self.__file.write(_GAME_HEADER.pack(agents[0], agents[1], seed, result.winner, len(result.moves))
+                          + bytes(piece << 4 | y * 4 + x for piece, x, y in result.moves))
+        self.__file.flush()
+
+    def on_game_end(self, game: Quarto, result: GameResult):
+        self.write(result)
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_games(path: str) -> Iterator[GameRecord]:
+    '''
+    Stream the games of a record file, mapped in memory. Raises ValueError on a
+    truncated last game, e.g. one still being written without a flush
+    '''
+    if os.path.getsize(path) <= len(MAGIC):
+        return
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        offset = len(MAGIC)
+        while offset < len(data):
+            if offset + _GAME_HEADER.size > len(data):
+                raise ValueError(f"{path} ends with a truncated game at byte {offset}")
+            agent_0, agent_1, seed, winner, plies = _GAME_HEADER.unpack_from(data, offset)
+            if offset + _GAME_HEADER.size + plies > len(data):
+                raise ValueError(f"{path} ends with a truncated game at byte {offset}")
+            offset += _GAME_HEADER.size
+            moves = tuple((move >> 4, move & 3, move >> 2 & 3) for move in data[offset:offset + plies])
+            offset += plies
+            yield GameRecord((agent_0, agent_1), seed, winner, moves)
+
+
+def replay(record: GameRecord, game: Quarto = None) -> Quarto:
+    '''
+    Play the moves of a record on a reset game (a new Quarto if none is given)
+    '''
+    game = Quarto() if game is None else game
+    game.reset()
+    for piece, x, y in record.moves:
+        game.push(piece, x, y)
+    return game
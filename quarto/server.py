@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+from abc import abstractmethod
+from typing import Callable
+from .objects import Forfeit, GameResult, GameStats, LegalRandomPlayer, Player, Quarto, TimeForfeit
+
+
+# protocol: one JSON object per line. A client sends {"type": "ready"} to join the queue
+# of the next game, then the server sends {"type": "start", "player": index}, the requests
+# {"type": "choose_piece" | "place_piece", "board": rows, "selected": piece, "player": index}
+# answered by {"piece": piece} or {"x": x, "y": y}, and {"type": "end", "winner": winner}
+
+
+class AsyncPlayer(Player):
+    '''
+    Player whose choose_piece and place_piece are coroutines, played by play_game()
+    '''
+    @abstractmethod
+    async def choose_piece(self) -> int:
+        pass
+
+    @abstractmethod
+    async def place_piece(self) -> tuple[int, int]:
+        pass
+
+
+class SyncPlayer(AsyncPlayer):
+    '''
+    A Player wrapped to be played by play_game(). Its moves block the event loop
+    '''
+    def __init__(self, player: Player) -> None:
+        super().__init__(player.get_game())
+        self.player = player
+
+    async def choose_piece(self) -> int:
+        return self.player.choose_piece()
+
+    async def place_piece(self) -> tuple[int, int]:
+        return self.player.place_piece()
+
+
+async def play_game(game: Quarto, players: tuple, move_timeout: float = None, recorder=None) -> GameResult:
+    '''
+    Play a game between two AsyncPlayers by the rules of Quarto.play(), firing the
+    observers of game and writing the result to recorder if given. Every choose_piece
+    and place_piece call gets move_timeout seconds: a player going over it, losing its
+    connection or answering with something that is not a piece or a cell loses the
+    game. The GameStats of the result hold the wall time of the calls, not their CPU
+    time, which is shared by all the games of the event loop
+    '''
+    stats = GameStats(game.MAX_PLAYERS)
+    plies = game._plies(stats, recorder=recorder)
+    try:
+        method = next(plies)
+        while True:
+            player = game.get_current_player()
+            start = time.perf_counter()
+            try:
+                answer = await asyncio.wait_for(getattr(players[player], method)(), move_timeout)
+            except asyncio.TimeoutError:
+                method = plies.throw(TimeForfeit(player))
+                continue
+            except ConnectionError:
+                method = plies.throw(Forfeit(player, 'lost its connection'))
+                continue
+            stats.players[player].add(method, time.perf_counter() - start, 0.0)
+            method = plies.send(answer)
+    except StopIteration as end:
+        return end.value
+
+
+async def play_games(matches, move_timeout: float = None) -> list:
+    '''
+    Play concurrently the games of matches, pairs (game, players), returning their results
+    '''
+    return await asyncio.gather(*(play_game(game, players, move_timeout) for game, players in matches))
+
+
+class _Connection(object):
+    '''
+    JSON lines over a stream
+    '''
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__reader = reader
+        self.__writer = writer
+
+    async def send(self, message: dict):
+        if self.__writer.is_closing():
+            raise ConnectionError('connection closed')
+        self.__writer.write(json.dumps(message).encode() + b'\n')
+        await self.__writer.drain()
+
+    async def receive(self) -> dict:
+        line = await self.__reader.readline()
+        if not line:
+            raise ConnectionError('connection closed')
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise ConnectionError(f"malformed message {line!r}")
+        if not isinstance(message, dict):
+            raise ConnectionError(f"malformed message {line!r}")
+        return message
+
+    async def request(self, message: dict) -> dict:
+        try:
+            await self.send(message)
+            return await self.receive()
+        except asyncio.CancelledError:
+            # timed out: a late answer would be taken for the one of the next request
+            self.close()
+            raise
+
+    async def ready(self) -> bool:
+        '''
+        Wait for the client to join a game, False once it is gone
+        '''
+        try:
+            return (await self.receive()).get('type') == 'ready'
+        except ConnectionError:
+            return False
+
+    def close(self):
+        if not self.__writer.is_closing():
+            self.__writer.close()
+
+
+def _answer(message: dict, *keys) -> tuple:
+    values = tuple(message.get(key) for key in keys)
+    if not all(type(value) is int for value in values):
+        raise ConnectionError(f"malformed answer {message}")
+    return values
+
+
+class RemotePlayer(AsyncPlayer):
+    '''
+    Player of a client connected to a MatchServer
+    '''
+    def __init__(self, quarto: Quarto, connection: _Connection, player: int) -> None:
+        super().__init__(quarto)
+        self.__connection = connection
+        self.__player = player
+
+    def __request(self, method: str) -> dict:
+        game = self.get_game()
+        return {'type': method, 'board': game.get_board_status().tolist(),
+                'selected': game.get_selected_piece(), 'player': self.__player}
+
+    async def choose_piece(self) -> int:
+        piece, = _answer(await self.__connection.request(self.__request('choose_piece')), 'piece')
+        if not 0 <= piece < 16:
+            raise ConnectionError(f"piece {piece} does not exist")
+        return piece
+
+    async def place_piece(self) -> tuple[int, int]:
+        return _answer(await self.__connection.request(self.__request('place_piece')), 'x', 'y')
+
+
+class MatchServer(object):
+    '''
+    Pairs the clients connecting on a TCP or Unix socket and plays all their games
+    concurrently in the event loop. Results are kept in results and written to
+    recorder (e.g. a records.GameWriter) if given
+    '''
+    def __init__(self, move_timeout: float = None, engine: Callable = Quarto, recorder=None) -> None:
+        self.move_timeout = move_timeout
+        self.engine = engine
+        self.recorder = recorder
+        self.results = []
+        self.__waiting = None
+        self.__server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: str = None,
+                    backlog: int = 4096) -> asyncio.AbstractServer:
+        '''
+        Listen on the Unix socket path if given, on host:port otherwise. backlog bounds
+        the connections waiting to be accepted, keep it above the clients connecting at once
+        '''
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__connected, path, backlog=backlog)
+        else:
+            self.__server = await asyncio.start_server(self.__connected, host, port, backlog=backlog)
+        return self.__server
+
+    async def close(self):
+        self.__server.close()
+        await self.__server.wait_closed()
+
+    async def __connected(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = _Connection(reader, writer)
+        while await connection.ready():
+            await self.__join(connection)
+        connection.close()
+
+    async def __join(self, connection: _Connection):
+        '''
+        Wait for an opponent and play the game, the first to come moves first
+        '''
+        if self.__waiting is None:
+            waiting = self.__waiting = (connection, asyncio.get_running_loop().create_future())
+            await waiting[1]
+            return
+        (first, done), self.__waiting = self.__waiting, None
+        try:
+            await self.__play((first, connection))
+        finally:
+            if not done.done():
+                done.set_result(None)
+
+    async def __play(self, connections: tuple):
+        game = self.engine()
+        players = tuple(RemotePlayer(game, connection, i) for i, connection in enumerate(connections))
+        for i, connection in enumerate(connections):
+            await _notify(connection, {'type': 'start', 'player': i})
+        result = await play_game(game, players, self.move_timeout, self.recorder)
+        for connection in connections:
+            await _notify(connection, {'type': 'end', 'winner': result.winner})
+        self.results.append(result)
+
+
+async def _notify(connection: _Connection, message: dict):
+    '''
+    Send a message that needs no answer, a client that is gone is noticed at its next move
+    '''
+    try:
+        await connection.send(message)
+    except ConnectionError:
+        pass
+
+
+async def run_client(host: str = '127.0.0.1', port: int = 0, path: str = None, games: int = 1,
+                     player_factory: Callable = LegalRandomPlayer) -> list:
+    '''
+    Stand-in client of a MatchServer: plays games with the Player built by
+    player_factory(game) on a local Quarto kept in sync with the server one
+    (random legal moves by default). Returns a (player index, winner) per game
+    '''
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    connection = _Connection(reader, writer)
+    game = Quarto()
+    player = player_factory(game)
+    outcomes = []
+    try:
+        for _ in range(games):
+            await connection.send({'type': 'ready'})
+            message = await connection.receive()
+            while message['type'] != 'end':
+                if message['type'] == 'start':
+                    index = message['player']
+                    game.reset()
+                else:
+                    game.set_board(np.array(message['board']))
+                    if message['selected'] >= 0:
+                        game.select(message['selected'])
+                    game._current_player = message['player']
+                    if message['type'] == 'choose_piece':
+                        await connection.send({'piece': int(player.choose_piece())})
+                    else:
+                        x, y = player.place_piece()
+                        await connection.send({'x': int(x), 'y': int(y)})
+                message = await connection.receive()
+            outcomes.append((index, message['winner']))
+    finally:
+        connection.close()
+    return outcomes
+
+
+async def _match(args) -> MatchServer:
+    server = MatchServer(args.timeout)
+    path = os.path.join(tempfile.mkdtemp(), 'quarto.sock') if args.unix else None
+    listening = await server.start(port=args.port, path=path)
+    port = None if path else listening.sockets[0].getsockname()[1]
+    await asyncio.gather(*(run_client(port=port, path=path, games=args.games) for _ in range(args.clients)))
+    await server.close()
+    if path:
+        os.remove(path)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play games between stand-in clients of a local match server')
+    parser.add_argument('-c', '--clients', type=int, default=1000, help='number of clients, two per game')
+    parser.add_argument('-g', '--games', type=int, default=1, help='games played by every client')
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='seconds allowed for every move')
+    parser.add_argument('-p', '--port', type=int, default=0, help='TCP port (default: any free one)')
+    parser.add_argument('-u', '--unix', action='store_true', help='use a Unix socket instead of TCP')
+    args = parser.parse_args()
+    if args.clients % 2:
+        parser.error('the number of clients must be even')
+
+    start = time.perf_counter()
+    server = asyncio.run(_match(args))
+    seconds = time.perf_counter() - start
+    winners = [result.winner for result in server.results]
+    forfeits = sum(result.stats.forfeit >= 0 for result in server.results)
+    logging.warning(f"server: {len(winners)} games in {seconds:.2f}s: first player {winners.count(0)}, "
+                    f"second player {winners.count(1)}, draws {winners.count(-1)}, forfeits {forfeits}")
+
+
+if __name__ == '__main__':
+    main()
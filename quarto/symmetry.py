@@ -0,0 +1,91 @@
+import itertools
+from typing import NamedTuple
+import numpy as np
+
+
+def _cell_symmetries() -> np.ndarray:
+    '''
+    The 32 permutations of the cells (y * 4 + x) that map lines onto lines: rows and
+    columns are permuted by the same sigma, possibly reversed for the columns, where
+    sigma commutes with the reversal i -> 3 - i (e.g. swap the inner and outer
+    rows), all optionally transposed
+    '''
+    symmetries = []
+    for sigma in itertools.permutations(range(4)):
+        if any(sigma[3 - i] != 3 - sigma[i] for i in range(4)):
+            continue
+        for tau in (sigma, tuple(3 - i for i in sigma)):
+            for transpose in (False, True):
+                image = []
+                for cell in range(16):
+                    y, x = sigma[cell // 4], tau[cell % 4]
+                    image.append(x * 4 + y if transpose else y * 4 + x)
+                symmetries.append(image)
+    return np.array(symmetries)
+
+
+def _piece_symmetries() -> np.ndarray:
+    '''
+    The 384 maps of the pieces given by a permutation of the 4 attribute bits
+    followed by the inversion of some of them
+    '''
+    symmetries = []
+    for bits in itertools.permutations(range(4)):
+        for inversion in range(16):
+            symmetries.append([sum((piece >> i & 1) << bits[i] for i in range(4)) ^ inversion
+                               for piece in range(16)])
+    return np.array(symmetries)
+
+
+# CELL_SYMMETRIES[t, c] is the image of cell c, PIECE_SYMMETRIES[m, p] the image of piece p
+CELL_SYMMETRIES = _cell_symmetries()
+PIECE_SYMMETRIES = _piece_symmetries()
+
+_CELL_SOURCES = np.argsort(CELL_SYMMETRIES, axis=1)
+# an extra column maps the empty cell (and no selected piece) to 0
+_PIECE_IMAGES = np.hstack((PIECE_SYMMETRIES, np.zeros((len(PIECE_SYMMETRIES), 1), dtype=int))).astype(np.uint64)
+_OCCUPIED_BITS = 1 << np.arange(16)
+_NIBBLE_SHIFTS = (4 * np.arange(16)).astype(np.uint64)
+
+
+class Symmetry(NamedTuple):
+    '''
+    Transform of a position: cells[c] is the image of cell c (y * 4 + x) and
+    pieces[p] the image of piece p
+    '''
+    cells: tuple
+    pieces: tuple
+
+    def apply_move(self, piece: int, x: int, y: int) -> tuple:
+        '''
+        Maps a move (piece, x, y) of the original position onto the transformed one
+        '''
+        cell = self.cells[y * 4 + x]
+        return (self.pieces[piece] if piece >= 0 else piece), cell % 4, cell // 4
+
+    def revert_move(self, piece: int, x: int, y: int) -> tuple:
+        '''
+        Maps a move (piece, x, y) of the transformed position back onto the original one
+        '''
+        cell = self.cells.index(y * 4 + x)
+        return (self.pieces.index(piece) if piece >= 0 else piece), cell % 4, cell // 4
+
+
+def canonicalize(board: np.ndarray, selected_piece: int = -1) -> tuple:
+    '''
+    Maps a position onto the representative of its class under the 32 board
+    symmetries, the 24 attribute permutations and the 16 attribute inversions.
+    Returns the key of the representative, an int equal for all the positions
+    of the class, and the Symmetry that transforms the position into it
+    '''
+    cells = np.asarray(board).ravel()
+    occupied = np.flatnonzero(cells >= 0)
+    # occupied cells mask first, then the pieces in the cells, then the selected piece
+    masks = _OCCUPIED_BITS[CELL_SYMMETRIES[:, occupied]].sum(axis=1)
+    candidates = np.flatnonzero(masks == masks.min())
+    pieces = np.where(cells < 0, 16, cells)[_CELL_SOURCES[candidates]]
+    packed = (_PIECE_IMAGES[:, pieces] << _NIBBLE_SHIFTS).sum(axis=2)
+    selected = np.broadcast_to(_PIECE_IMAGES[:, selected_piece if selected_piece >= 0 else 16, None], packed.shape)
+    m, t = np.unravel_index(np.lexsort((selected.ravel(), packed.ravel()))[0], packed.shape)
+    key = int(masks.min()) << 69 | int(packed[m, t]) << 5 | int(selected[m, t]) + int(selected_piece >= 0)
+    return key, Symmetry(tuple(CELL_SYMMETRIES[candidates[t]].tolist()), tuple(PIECE_SYMMETRIES[m].tolist()))
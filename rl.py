@@ -4,7 +4,6 @@ from quarto import Player
 import extendedQuarto
 import numpy as np
 import pickle
-from testQuarto import TestQuarto
 
 
 class QTableKey(object):
@@ -105,37 +104,8 @@ class RLPlayer(Player):
         """
         Return a list of possible moves, [(x,y,id),(x,y,id),...,(x,y,id)]
         """
-      
-        current_state = self.get_game()
-        board = current_state.get_board_status()
-        selected_piece = current_state.get_selected_piece()
-        
-        empty_places = [] # list of empty places which are (x, y)
-        not_selected_pieces = list(range(16)) #generates a list with values 0 to 15
-
-        if (selected_piece != -1): # why are we doing this. 
-            not_selected_pieces.remove(selected_piece) 
-            
-        for y, row in enumerate(board):
-            for x, index_at_place in enumerate(row): # for all places in row, index_on_place = -1 if no piece on place
-                                                     #otherwise the index of the piece
-                if (index_at_place == -1):
-                    empty_places.append((x,y)) #adds the empty place to the list
-
-                else: # if there is a piece at the place, remove it from not_selected_pieces
-                   not_selected_pieces.remove(index_at_place) 
-
-        possible_moves = []
-
-        # add all possible moves
-        for empty_place in empty_places:
-            if len(not_selected_pieces) > 0:
-                for piece in not_selected_pieces:
-                    possible_moves.append((empty_place[0], empty_place[1], piece))
-            else:
-                possible_moves.append((empty_place[0], empty_place[1], -1)) #when there is only one piece left
-        
-        return possible_moves
+        # shared by the engine, computed once per position
+        return self.get_game().legal_move_list()
         
 
     def add_new_state_move(self) -> None:
@@ -231,23 +201,19 @@ class RLPlayer(Player):
         if self.previous_move is not None:  # if it is not the first move
               
             game = self.get_game()
-            b = game.get_board_status()
-            next_state = TestQuarto(b)
-            
-
-            next_state.select(game.get_selected_piece()) # set the selected piece in the copied board to the same one in the original one
-                
-            next_state.place(current_move[0], current_move[1]) #apply move
-             
             reward = 0
-            
-            # check winner or draw -> change reward. 
-            if (next_state.check_finished() and (next_state.check_winner() == -1)): # check if draw
-                reward = self.DRAW_REWARD
 
+            # apply move, undone once the reward is known. A refused move changes nothing and earns nothing
+            if game.push(game.get_selected_piece(), current_move[0], current_move[1]):
+                # check winner or draw -> change reward. 
+                if (game.check_finished() and (game.check_winner() == -1)): # check if draw
+                    reward = self.DRAW_REWARD
+
+
+                if (game.check_winner() >= 0): # check if winner
+                    reward = self.REWARD
 
-            if (next_state.check_winner() >= 0): # check if winner
-                reward = self.REWARD
+                game.pop()
     
             
             possible_moves = self.generate_possible_moves()
@@ -8,7 +8,7 @@ class TestQuarto(quarto.Quarto):
     '''
     def __init__(self, board: np):
         super(TestQuarto, self).__init__()    
-        self._board = board
+        self.set_board(board)
         
     def get_test_board_status(self):
         '''
@@ -1,7 +1,7 @@
 import extendedQuarto
 from rl import *
 from main import RandomPlayer
-from quarto import Player
+from quarto import GameObserver, Player
 import logging
 from trained_rl import TrainedRL
 from opponent_agents import DumbAgent
@@ -10,60 +10,36 @@ from tqdm import tqdm
 from ga_dumb import UntrainedGAAgent
 from ga_less_dumb import LeastDumbAgent
 
+class QLearnerObserver(GameObserver):
+    '''
+    Makes the Q-Learner update its table every time it receives a piece to place
+    '''
+    def __init__(self, q_learner: RLPlayer, q_learner_turn: int) -> None:
+        self.q_learner = q_learner
+        self.q_learner_turn = q_learner_turn
+
+    def on_select(self, game, player: int, piece: int):
+        if game.get_current_player() == self.q_learner_turn:
+            self.q_learner.update_q()
+
+
 def train_q_learner(game: extendedQuarto.ExtendedQuarto, q_learner: RLPlayer, external_agent: Player, q_learner_turn: int) -> int:
     '''
     Function to run a game between the Q-Learner and an opponent agent
     '''
-    
-    player = 0
-    winner = -1
-
     if(q_learner_turn == 0):
-        is_q_learner = True
         players = (q_learner, external_agent)
-        q_learner_player = 0
     else:
-        is_q_learner = False
         players = (external_agent, q_learner)
-        q_learner_player = 1
-    
-    
-    while not game.check_finished() and game.check_winner() == -1: 
-        
-        piece_ok = False
-        
-        while not piece_ok: 
-            piece_ok = game.select(players[player].choose_piece())
-    
-        piece_ok = False
-   
-        if player == 0: #switch players
-            player = 1
-            game.set_current_player(1)
-            if(q_learner_player == 1):
-                is_q_learner = True
-            else:
-                is_q_learner = False
-        else: 
-            player = 0
-            game.set_current_player(0)
-            if(q_learner_player == 0):
-                is_q_learner = True
-            else:
-                is_q_learner = False
-        
-        if (is_q_learner == True):
-            q_learner.update_q()
+    game.set_players(players)
 
-       
-        while not piece_ok:
-            x, y = players[player].place_piece()
-            piece_ok = game.place(x, y)
-    
+    observer = QLearnerObserver(q_learner, q_learner_turn)
+    game.add_observer(observer)
+    try:
+        winner = game.play().winner
+    finally:
+        game.remove_observer(observer)
 
-        winner = game.check_winner()
-
-    
     if (winner != q_learner_turn): # q-learner didn't win
         if (winner == -1): # draw
             q_learner.update_when_draw() 
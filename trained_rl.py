@@ -105,32 +105,7 @@ class TrainedRL(Player):
       """
       Return a list of possible moves, [(x,y,id),(x,y,id),...,(x,y,id)]
       """
-      current_state = self.get_game() # type -> ExtendedQuarto
-      board = current_state.get_board_status() # the list with the board
-      selected_piece = current_state.get_selected_piece()
-   
-      empty_places = []  # list of empty places which are (x, y)
-      not_selected_pieces = list(range(16)) #generates a list fom 0 to 15
-      if (selected_piece != -1): 
-          not_selected_pieces.remove(selected_piece) 
-
-      for y, row in enumerate(board):
-          for x, index_at_place in enumerate(row): # for all places in row, index_on_place = -1 if no piece on place 
-                                                   #otherwise the index of the piece
-              if (index_at_place == -1):
-                  empty_places.append((x,y))
-              else: # if there is a piece at the place, remove it from not_selected_pieces
-                  not_selected_pieces.remove(index_at_place)
-
-      possible_moves = []
-
-      for empty_place in empty_places: # add all possible moves
-          if len(not_selected_pieces) > 0:
-              for piece in not_selected_pieces:
-                  possible_moves.append((empty_place[0], empty_place[1], piece))
-          else:
-              possible_moves.append((empty_place[0], empty_place[1], -1)) #when there is only one piece left
-      
-      return possible_moves
+      # shared by the engine, computed once per position
+      return self.get_game().legal_move_list()
       
   